@@ -0,0 +1,194 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pygame as pg
+
+from pathlib import Path
+
+from python_doom.settings import ScreenConfig as SCREEN
+from python_doom.settings import GraphicsConfig as GRAPHICS
+
+
+# bump to invalidate cached assets after changes of the preprocessing
+ASSETS_VERSION = 2
+
+IMAGE_DIRS = ['resources/textures', 'resources/sprites']
+SOUND_DIR = 'resources/sound'
+
+
+def asset_group(path) -> str:
+    """Up to two directories below `resources`, e.g. 'sprites/npc'."""
+    return '/'.join(Path(path).parts[1:-1][:2])
+
+
+def asset_files(directories, suffix) -> list:
+    files = []
+    for directory in directories:
+        for root, dirs, names in os.walk(directory):
+            dirs.sort()
+            files += [os.path.join(root, name) for name in sorted(names)
+                      if name.endswith(suffix)]
+    return files
+
+
+class AssetCache:
+    """Images decoded and scaled once per key, then kept resident.
+
+    Preprocessed images are baked as RGBA arrays into one NPZ file, named
+    by a hash of the content of all images and of the settings that
+    determine their scaled sizes. Images missing in that file are decoded
+    from disk and added by the next `save`.
+
+    Reading and decoding (`read_baked`, `decode`) is safe to be run on
+    other threads, `add` converts to the display format on the main one.
+    """
+
+    def __init__(self, cache_dir=GRAPHICS.asset_cache_dir,
+                 enabled=GRAPHICS.asset_cache):
+        self.enabled = enabled
+        self.images = {}
+        self.sounds = {}
+        # RGBA arrays at original size, decoded ahead of time by a loader
+        self.decoded = {}
+
+        self.path = None
+        self.baked_keys = []
+        self._baked = {}
+        self._new = {}
+        self._local = threading.local()
+        if enabled:
+            self.path = os.path.join(cache_dir, f'assets_{self._hash()}.npz')
+            if os.path.isfile(self.path):
+                self._baked = np.load(self.path)
+                self.baked_keys = list(self._baked.files)
+
+    @staticmethod
+    def _hash() -> str:
+        digest = hashlib.sha1(str((
+            ASSETS_VERSION, SCREEN.width, SCREEN.height,
+            GRAPHICS.texture_size, GRAPHICS.player_health_size
+        )).encode())
+
+        for path in asset_files(IMAGE_DIRS, ''):
+            digest.update(path.encode())
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        return digest.hexdigest()[:16]
+
+    @staticmethod
+    def key(path, size=None, scale=None, smooth=False) -> str:
+        digest = hashlib.sha1(str((path, size, scale, smooth)).encode())
+        return f'{asset_group(path)}:{digest.hexdigest()}'
+
+    def load_image(self, path, size=None, scale=None, smooth=False):
+        """Image of `path`, scaled to `size` or by factor `scale`."""
+        key = self.key(path, size, scale, smooth)
+        image = self.images.get(key)
+        if image is not None:
+            return image
+
+        if key in self._baked:
+            return self.add(key, self._baked[key])
+        image = self.decoded.get(path)
+        if image is not None:
+            image = pg.image.frombuffer(
+                image, (image.shape[1], image.shape[0]), 'RGBA'
+            )
+        return self.add(key, self.decode(path, size, scale, smooth, image))
+
+    def load_images(self, directory, scale=None, smooth=False) -> list:
+        """All images within `directory`, sorted by file name."""
+        files = [f for f in os.listdir(directory)
+                 if os.path.isfile(os.path.join(directory, f))]
+        return [
+            self.load_image(os.path.join(directory, file),
+                            scale=scale, smooth=smooth)
+            for file in sorted(files)
+        ]
+
+    def load_sound(self, path) -> pg.mixer.Sound:
+        sound = self.sounds.get(path)
+        if sound is None:
+            sound = self.sounds[path] = pg.mixer.Sound(path)
+        return sound
+
+    def read_baked(self, key) -> np.ndarray:
+        # NOTE: the NPZ file is opened once per thread, reads of one handle
+        # from several threads would interfere
+        baked = getattr(self._local, 'baked', None)
+        if baked is None:
+            baked = self._local.baked = np.load(self.path)
+        return baked[key]
+
+    @staticmethod
+    def decode(path, size=None, scale=None, smooth=False, image=None):
+        """RGBA array of image of `path`, or of its already loaded `image`."""
+        if image is None:
+            image = pg.image.load(path)
+        image = pg.image.frombytes(
+            pg.image.tobytes(image, 'RGBA'), image.get_size(), 'RGBA'
+        )
+
+        if scale is not None:
+            size = int(image.get_width() * scale), \
+                int(image.get_height() * scale)
+        if size is not None:
+            if smooth:
+                image = pg.transform.smoothscale(image, size)
+            else:
+                image = pg.transform.scale(image, size)
+
+        return np.frombuffer(
+            pg.image.tobytes(image, 'RGBA'), dtype=np.uint8
+        ).reshape(image.get_height(), image.get_width(), 4)
+
+    def add(self, key, pixels: np.ndarray) -> pg.Surface:
+        """Convert RGBA array to a resident image in display format."""
+        image = pg.image.frombuffer(
+            pixels, (pixels.shape[1], pixels.shape[0]), 'RGBA'
+        ).convert_alpha()
+        self.images[key] = image
+
+        if self.enabled and key not in self._baked:
+            self._new[key] = pixels
+        return image
+
+    def save(self):
+        """Write all baked and newly decoded images, if there are new ones."""
+        if not self._new:
+            return
+
+        baked = {key: self._baked[key] for key in self._baked}
+        baked.update(self._new)
+        self._new = {}
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary = self.path + '.tmp.npz'
+        np.savez(temporary, **baked)
+        os.replace(temporary, self.path)
+        self._baked = baked
+
+
+class FrameRegistry:
+    """Animation frames of a directory, loaded once and shared as tuple.
+
+    Frames stay in the registry for the lifetime of the game, like their
+    images in the `AssetCache`, so there is nothing to release.
+    """
+
+    def __init__(self, assets: AssetCache):
+        self.assets = assets
+        self._frames = {}
+
+    def acquire(self, directory, scale=None, smooth=False) -> tuple:
+        key = directory, scale, smooth
+        frames = self._frames.get(key)
+        if frames is None:
+            frames = tuple(self.assets.load_images(directory, scale, smooth))
+            self._frames[key] = frames
+        return frames
+
+    def __len__(self):
+        return len(self._frames)
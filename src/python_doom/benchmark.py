@@ -0,0 +1,316 @@
+"""Headless end-to-end frame benchmark.
+
+Runs the full `Game.tick`/`Game.update`/`Game.draw` loop without window
+and sound, while the camera follows a scripted path with a fixed frame
+time. Must be
+started from the repository root, since resources are loaded relative
+to it:
+
+    python -m python_doom.benchmark --frames 600 --output bench.json
+
+With `--ray-casting-workers N` the ray casting and wall stages are timed
+for 1 up to N threads instead. With `--capture PATH` the measured frames
+are captured to PATH, to time the capture against a run without.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+
+import numpy as np
+
+from python_doom.game import Game
+from python_doom.settings import ScreenConfig as SCREEN
+from python_doom.settings import GraphicsConfig as GRAPHICS
+from python_doom.settings import PlayerConfig as PLAYER
+from python_doom.settings import CaptureConfig as CAPTURE
+
+
+# waypoints through free tiles of the map, walked back and forth
+CAMERA_PATH = [
+    (13.5, 1.5), (2.5, 1.5), (2.5, 6.5), (11, 6.5),
+    (11, 13), (6, 17), (4.5, 25), (13, 29)
+]
+
+PERCENTILES = [50, 95, 99]
+
+
+class CameraPath:
+    """Camera pose along a polyline, looking around while walking."""
+    SWEEP_AMPLITUDE = 0.6  # rad
+    SWEEP_PERIOD = 4.0  # tiles
+
+    def __init__(self, waypoints):
+        waypoints = list(waypoints) + list(reversed(waypoints))[1:-1]
+        self.points = np.array(waypoints + waypoints[:1], dtype=float)
+        self.segments = np.diff(self.points, axis=0)
+        self.lengths = np.hypot(*self.segments.T)
+        self.ends = np.cumsum(self.lengths)
+
+    def pose(self, distance: float) -> tuple:
+        distance %= self.ends[-1]
+        idx = int(np.searchsorted(self.ends, distance, side='right'))
+        start = self.ends[idx] - self.lengths[idx]
+        x, y = self.points[idx] + \
+            self.segments[idx] * (distance - start) / self.lengths[idx]
+
+        heading = math.atan2(self.segments[idx][1], self.segments[idx][0]) + \
+            self.SWEEP_AMPLITUDE * math.sin(
+                math.tau * distance / self.SWEEP_PERIOD
+            )
+        return float(x), float(y), heading % math.tau
+
+
+class BenchmarkGame(Game):
+    def __init__(self, dt, camera_path,
+                 dynamic_resolution=GRAPHICS.dynamic_resolution):
+        self.fixed_dt = dt
+        self.camera_path = camera_path
+        self.distance = 0.0
+        self.frame_timings = {}
+        super().__init__()
+        if not dynamic_resolution:
+            self.resolution = None
+
+    def _move_camera(self):
+        player = self.player
+        player.prev_x, player.prev_y = player.x, player.y
+        player.prev_heading = player.heading
+
+        self.distance += PLAYER.movement_speed * self.dt
+        player.x, player.y, player.heading = \
+            self.camera_path.pose(self.distance)
+        # keep the player alive, the game over screen is no benchmark
+        player.health = 100
+
+    def _tick_subsystem(self, name):
+        start = time.perf_counter()
+        if name == 'player':
+            self._move_camera()
+        else:
+            super()._tick_subsystem(name)
+        self.frame_timings[name] += time.perf_counter() - start
+
+    def _update_subsystem(self, name):
+        start = time.perf_counter()
+        super()._update_subsystem(name)
+        self.frame_timings[name] += time.perf_counter() - start
+
+    def _limit_frame_rate(self):
+        self.clock.tick()
+        return self.fixed_dt
+
+    def draw(self):
+        start = time.perf_counter()
+        super().draw()
+        self.frame_timings['renderer'] = time.perf_counter() - start
+
+    def frame(self) -> dict:
+        """Run one frame, return the time per subsystem in s and the scale."""
+        self.frame_timings = dict.fromkeys(self.SUBSYSTEMS + ['renderer'], 0.0)
+        start = time.perf_counter()
+        self.check_events()
+        self.step(self.sim_clock.advance(self.frame_dt))
+        self.update()
+        self.draw()
+        self.frame_timings['frame'] = time.perf_counter() - start
+        self.frame_timings['resolution_scale'] = self.viewport.scale
+        return self.frame_timings
+
+
+def summarize(seconds) -> dict:
+    ms = np.asarray(seconds) * 1e3
+    stats = {'mean': float(ms.mean())}
+    for p in PERCENTILES:
+        stats[f'p{p}'] = float(np.percentile(ms, p))
+    stats['max'] = float(ms.max())
+    return stats
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(frames=600, warmup=60, dt=1000 / 60,
+        dynamic_resolution=GRAPHICS.dynamic_resolution,
+        capture=None, capture_writer=CAPTURE.writer) -> dict:
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+
+    # NOTE: drivers must be set before `Game` initializes pygame
+    start = time.perf_counter()
+    game = BenchmarkGame(dt, CameraPath(CAMERA_PATH), dynamic_resolution)
+    init_time = time.perf_counter() - start
+    game.frame()
+    first_frame_time = time.perf_counter() - start
+
+    for _ in range(warmup):
+        game.frame()
+
+    if capture:
+        game.capture.start(capture, capture_writer, max_frames=frames)
+    timings = [game.frame() for _ in range(frames)]
+    frame_times = [t['frame'] for t in timings]
+    capture_report = game.capture.stop()
+    scales = np.array([t['resolution_scale'] for t in timings])
+
+    return {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'frames': frames,
+        'warmup': warmup,
+        'dt': dt,
+        'resolution': [SCREEN.width, SCREEN.height],
+        'resolution_scale': {
+            'dynamic': game.resolution is not None,
+            'mean': float(scales.mean()),
+            'min': float(scales.min()),
+            'max': float(scales.max()),
+        },
+        'graphics': {
+            key: value for key, value in vars(GRAPHICS).items()
+            if not key.startswith('_') and
+            isinstance(value, (bool, int, float, str))
+        },
+        'startup_ms': {
+            'init': init_time * 1e3,
+            'first_frame': first_frame_time * 1e3,
+            'asset_loading': game.asset_loader.total,
+            'asset_groups': dict(game.asset_loader.times),
+        },
+        'fps': frames / sum(frame_times),
+        'frame_time_ms': summarize(frame_times),
+        'subsystems_ms': {
+            name: summarize([t[name] for t in timings])
+            for name in game.SUBSYSTEMS + ['renderer']
+        },
+        'path_cache_hit_rate': game.path_finding.cache_hit_rate,
+        'capture': capture_report,
+    }
+
+
+def ray_casting_scaling(max_workers, frames=300, warmup=30,
+                        dt=1000 / 60) -> dict:
+    """Time of ray casting and renderer per frame for 1 to `max_workers`.
+
+    All worker counts follow the same camera path at fixed resolution.
+    """
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+
+    game = BenchmarkGame(dt, CameraPath(CAMERA_PATH), dynamic_resolution=False)
+    workers = {}
+    for count in range(1, max_workers + 1):
+        game.ray_caster.set_workers(count)
+        game.distance = 0.0
+        for _ in range(warmup):
+            game.frame()
+
+        timings = [game.frame() for _ in range(frames)]
+        workers[count] = {
+            name: summarize([t[name] for t in timings])
+            for name in ['ray_caster', 'renderer', 'frame']
+        }
+    game.ray_caster.set_workers(1)
+
+    baseline = workers[1]['ray_caster']['mean'] + \
+        workers[1]['renderer']['mean']
+    for stats in workers.values():
+        stats['speedup'] = baseline / (
+            stats['ray_caster']['mean'] + stats['renderer']['mean']
+        )
+
+    return {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'frames': frames,
+        'warmup': warmup,
+        'wall_renderer': GRAPHICS.wall_renderer,
+        'workers': workers,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--warmup', type=int, default=60)
+    parser.add_argument('--dt', type=float, default=1000 / 60,
+                        help='fixed real time per frame in ms')
+    parser.add_argument('--output', default='bench.json',
+                        help='path of the JSON result, - for stdout only')
+    parser.add_argument('--fixed-resolution', action='store_true',
+                        help='keep the resolution scale of the settings')
+    parser.add_argument('--ray-casting-workers', type=int, metavar='N',
+                        help='time ray casting with 1 up to N threads')
+    parser.add_argument('--capture', metavar='PATH',
+                        help='capture the measured frames to PATH')
+    parser.add_argument('--capture-writer', choices=['raw', 'mmap'],
+                        default=CAPTURE.writer)
+    args = parser.parse_args()
+
+    if args.ray_casting_workers:
+        result = ray_casting_scaling(
+            args.ray_casting_workers, args.frames, args.warmup, args.dt
+        )
+        print(f'{result["cpu_count"]} cores, '
+              f'{result["wall_renderer"]} wall renderer')
+        for count, stats in result['workers'].items():
+            print(f'  {count:2d} workers  '
+                  f'ray casting {stats["ray_caster"]["mean"]:.2f} ms, '
+                  f'renderer {stats["renderer"]["mean"]:.2f} ms, '
+                  f'frame {stats["frame"]["mean"]:.2f} ms, '
+                  f'speedup {stats["speedup"]:.2f}')
+        if args.output != '-':
+            with open(args.output, 'w') as f:
+                json.dump(result, f, indent=2)
+        return
+
+    result = run(args.frames, args.warmup, args.dt,
+                 GRAPHICS.dynamic_resolution and not args.fixed_resolution,
+                 args.capture, args.capture_writer)
+
+    startup = result['startup_ms']
+    print(f'first frame after {startup["first_frame"]:.0f} ms, '
+          f'assets loaded in {startup["asset_loading"]:.0f} ms')
+    for group, times in startup['asset_groups'].items():
+        print(f'  {group:24s} {times["files"]:3d} files, '
+              f'load {times["load"]:.1f} ms, finalize {times["finalize"]:.1f} ms')
+    print(f'{result["fps"]:.1f} fps, frame time ' + ', '.join(
+        f'{key} {value:.2f} ms'
+        for key, value in result['frame_time_ms'].items()
+    ))
+    for name, stats in result['subsystems_ms'].items():
+        print(f'  {name:16s} ' + ', '.join(
+            f'{key} {value:.2f} ms' for key, value in stats.items()
+        ))
+    print(f'path cache hit rate {result["path_cache_hit_rate"]:.1%}')
+    scale = result['resolution_scale']
+    print(f'resolution scale mean {scale["mean"]:.0%}, '
+          f'min {scale["min"]:.0%}, max {scale["max"]:.0%}')
+    capture = result['capture']
+    if capture:
+        print(f'captured {capture["frames"]} frames, '
+              f'dropped {capture["dropped"]}, copy ' + ', '.join(
+                  f'{key} {value:.2f} ms'
+                  for key, value in capture['copy_ms'].items()
+              ))
+
+    if args.output != '-':
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+from collections import OrderedDict
+
+import pygame as pg
+
+
+class SurfaceCache:
+    """Least recently used cache of surfaces with a memory limit.
+
+    Surfaces larger than the limit itself are not cached at all.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        self._surfaces = OrderedDict()
+
+    def get(self, key, create):
+        """Return cached surface of `key` or call `create` to build it."""
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = create()
+        self._add(key, surface)
+        return surface
+
+    def _add(self, key, surface: pg.Surface):
+        size = self.surface_size(surface)
+        if size > self.max_bytes:
+            return
+
+        self._surfaces[key] = surface
+        self.size += size
+        while self.size > self.max_bytes:
+            _, evicted = self._surfaces.popitem(last=False)
+            self.size -= self.surface_size(evicted)
+
+    def clear(self):
+        self._surfaces.clear()
+        self.size = 0
+
+    @staticmethod
+    def surface_size(surface: pg.Surface) -> int:
+        width, height = surface.get_size()
+        return width * height * surface.get_bytesize()
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def __len__(self):
+        return len(self._surfaces)
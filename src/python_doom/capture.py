@@ -0,0 +1,191 @@
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+from typing import Optional
+
+import numpy as np
+import pygame as pg
+
+from python_doom.settings import CaptureConfig as CAPTURE
+
+
+def rgb_channels(surface) -> list:
+    """Byte of red, green and blue within a pixel of `surface`."""
+    if surface.get_bytesize() != 4:
+        raise ValueError('frame capture requires a 32 bit surface')
+    shifts = [shift // 8 for shift in surface.get_shifts()[:3]]
+    return shifts if sys.byteorder == 'little' else \
+        [3 - shift for shift in shifts]
+
+
+def copy_rgb(surface, out: np.ndarray, channels: list):
+    """Copy pixels of `surface` into `out` of shape `(height, width, 3)`."""
+    height, width, _ = out.shape
+    rows = np.frombuffer(surface.get_buffer(), dtype=np.uint8).reshape(
+        height, -1
+    )
+    np.take(
+        rows[:, :width * 4].reshape(height, width, 4), channels, axis=2,
+        out=out
+    )
+
+
+class FrameCapture:
+    """Captures finished frames of `screen` for a background writer.
+
+    The main loop only copies the pixel buffer of the screen into a free
+    slot of a preallocated ring, which is one memcpy. A writer thread
+    converts the slot to RGB straight into its output, a raw RGB stream
+    or a memory-mapped file of `max_frames` frames. Frames arriving while
+    all slots wait for the writer are dropped instead of stalling the
+    main loop. `stop` writes a report next to the capture.
+    """
+
+    def __init__(self, screen, ring_size=CAPTURE.ring_size):
+        self.screen = screen
+        self.ring_size = ring_size
+        self.width, self.height = screen.get_size()
+        # checked on `start`, any display can run without capture
+        self.channels = None
+
+        self.ring = None
+        self.path = None
+        self.writer = None
+        self.frames = 0
+        self.dropped = 0
+        self.copy_times = []
+
+        self.toggle_key = pg.key.key_code(CAPTURE.toggle_key)
+
+    @property
+    def active(self) -> bool:
+        return self.path is not None
+
+    def start(self, path=None, writer=CAPTURE.writer,
+              max_frames=CAPTURE.max_frames):
+        if self.active:
+            return
+        self.channels = rgb_channels(self.screen)
+        if self.ring is None:
+            # raw rows of the screen, pitch may be padded beyond the width
+            self.ring = np.empty(
+                (self.ring_size, self.height, self.screen.get_pitch()),
+                dtype=np.uint8
+            )
+
+        self.path = path or time.strftime(CAPTURE.path)
+        self.frames = 0
+        self.dropped = 0
+        self.copy_times = []
+
+        self._free = queue.Queue()
+        for slot in range(self.ring_size):
+            self._free.put(slot)
+        self._filled = queue.Queue()
+
+        if writer == 'mmap':
+            output = np.memmap(
+                self.path, dtype=np.uint8, mode='w+',
+                shape=(max_frames, self.height, self.width, 3)
+            )
+            target = self._write_mmap
+        elif writer == 'raw':
+            output = open(self.path, 'wb')
+            target = self._write_raw
+        else:
+            raise ValueError(f'unknown capture writer {writer!r}')
+
+        self.writer = writer
+        self._written = 0
+        self._writer = threading.Thread(
+            target=target, args=(output,), name='frame-capture'
+        )
+        self._writer.start()
+
+    def capture(self):
+        """Hand the finished frame on the screen to the writer."""
+        if not self.active:
+            return
+
+        start = time.perf_counter()
+        try:
+            slot = self._free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return
+
+        np.copyto(
+            self.ring[slot].reshape(-1),
+            np.frombuffer(self.screen.get_buffer(), dtype=np.uint8)
+        )
+        self._filled.put(slot)
+        self.frames += 1
+        self.copy_times.append(time.perf_counter() - start)
+
+    def _pixels(self, slot) -> np.ndarray:
+        return self.ring[slot, :, :self.width * 4].reshape(
+            self.height, self.width, 4
+        )
+
+    def _write_raw(self, file):
+        rgb = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        with file:
+            for slot in iter(self._filled.get, None):
+                np.take(self._pixels(slot), self.channels, axis=2, out=rgb)
+                self._free.put(slot)
+                file.write(rgb)
+                self._written += 1
+
+    def _write_mmap(self, frames):
+        for slot in iter(self._filled.get, None):
+            if self._written < len(frames):
+                np.take(
+                    self._pixels(slot), self.channels, axis=2,
+                    out=frames[self._written]
+                )
+                self._written += 1
+            self._free.put(slot)
+
+        frames.flush()
+
+    def stop(self) -> Optional[dict]:
+        """Wait for the writer and return the report of the capture."""
+        if not self.active:
+            return None
+
+        self._filled.put(None)
+        self._writer.join()
+        if self.writer == 'mmap':
+            # the file only keeps the frames written, once it is unmapped
+            os.truncate(self.path, self._written * self.height * self.width * 3)
+
+        copy_ms = np.array(self.copy_times or [0.0]) * 1e3
+        report = {
+            'path': self.path,
+            'format': 'rgb24',
+            'size': [self.width, self.height],
+            'frames': self._written,
+            # no free slot or the memory-mapped file was full
+            'dropped': self.dropped + self.frames - self._written,
+            'copy_ms': {
+                'mean': float(copy_ms.mean()),
+                'p99': float(np.percentile(copy_ms, 99)),
+                'max': float(copy_ms.max()),
+            },
+        }
+        with open(self.path + '.json', 'w') as f:
+            json.dump(report, f, indent=2)
+
+        self.path = None
+        return report
+
+    def check_events(self, event):
+        if event.type == pg.KEYDOWN and event.key == self.toggle_key:
+            if self.active:
+                self.stop()
+            else:
+                self.start()
@@ -0,0 +1,57 @@
+import math
+
+from python_doom.settings import SimulationConfig as SIMULATION
+
+
+class SimulationClock:
+    """Fixed-rate clock of the simulation, decoupled from rendering.
+
+    Rendered frames hand their elapsed time to `advance`, which returns
+    how many fixed steps of `dt` are due. The remainder is used as
+    `alpha` to interpolate between the last two steps.
+    """
+
+    def __init__(self, tick_rate=SIMULATION.tick_rate,
+                 max_ticks_per_frame=SIMULATION.max_ticks_per_frame,
+                 interpolate=SIMULATION.interpolate):
+        self.dt = 1000 / tick_rate  # ms
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.interpolate = interpolate
+
+        self.time = 0.0  # simulated ms
+        self.ticks = 0
+        self.accumulator = 0.0
+
+    def advance(self, elapsed: float) -> int:
+        """Add elapsed real time in ms and return the number of due steps."""
+        self.accumulator += elapsed
+        ticks = int(self.accumulator // self.dt)
+
+        if ticks > self.max_ticks_per_frame:
+            # NOTE: rather slow down than spiral into ever longer frames
+            ticks = self.max_ticks_per_frame
+            self.accumulator = ticks * self.dt + self.accumulator % self.dt
+
+        self.accumulator -= ticks * self.dt
+        return ticks
+
+    def step(self):
+        self.time += self.dt
+        self.ticks += 1
+
+    @property
+    def alpha(self) -> float:
+        """Fraction of the next step that has already passed in real time."""
+        if not self.interpolate:
+            return 1.0
+        return min(self.accumulator / self.dt, 1.0)
+
+
+def lerp(previous: float, current: float, alpha: float) -> float:
+    return previous + (current - previous) * alpha
+
+
+def lerp_angle(previous: float, current: float, alpha: float) -> float:
+    """Interpolate along the shorter arc, result is within [0, tau)."""
+    delta = (current - previous + math.pi) % math.tau - math.pi
+    return (previous + delta * alpha) % math.tau
@@ -0,0 +1,51 @@
+import random
+
+from collections import namedtuple
+
+import pygame as pg
+
+from python_doom.settings import ScreenConfig as SCREEN
+from python_doom.settings import ControlsConfig as CONTROLS
+
+
+# keys read by `Player` every tick
+KEYS = [pg.K_w, pg.K_s, pg.K_a, pg.K_d, pg.K_LEFT, pg.K_RIGHT]
+
+TickInput = namedtuple('TickInput', ['keys', 'mouse_rel'])
+
+
+class LiveControls:
+    """Input of keyboard and mouse as read by `Game` and `Player`.
+
+    Per frame `Game` calls `events`, `frame_dt` and `end_frame`, per tick
+    `Player` calls `read`. Sources of recorded input implement the same
+    methods, see `python_doom.replay`.
+    """
+    finished = False
+
+    def __init__(self, seed=None):
+        # seed of the global `random` module, which npc draw from
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+
+    def events(self) -> list:
+        return pg.event.get()
+
+    def frame_dt(self, frame_dt: float) -> float:
+        """Real time in ms the simulation advances by this frame."""
+        return frame_dt
+
+    def read(self) -> TickInput:
+        x, y = pg.mouse.get_pos()
+        if not (
+            CONTROLS.mouse_border_left <= x <= CONTROLS.mouse_border_right and
+            CONTROLS.mouse_border_bottom <= y <= CONTROLS.mouse_border_top
+        ):
+            pg.mouse.set_pos([SCREEN.half_width, SCREEN.half_height])
+
+        return TickInput(pg.key.get_pressed(), pg.mouse.get_rel()[0])
+
+    def end_frame(self):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,387 @@
+"""Vectorized environment of matches for agents, stepped in lockstep.
+
+Observations are written into preallocated arrays, which `reset` and
+`step` return as they are, without copying. With several workers the
+arrays live in shared memory, each process steps a group of the envs.
+Measure the throughput with random actions:
+
+    python -m python_doom.environment --envs 16 --workers 4 --steps 2000
+
+Must be started from the repository root, like the game.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import random
+import time
+
+import numpy as np
+import pygame as pg
+
+from python_doom.capture import copy_rgb, rgb_channels
+from python_doom.controls import KEYS, TickInput
+from python_doom.game import Game
+from python_doom.ray_casting import cast_rays
+from python_doom.simulation import SHOT, Match
+from python_doom.settings import ScreenConfig as SCREEN
+from python_doom.settings import GraphicsConfig as GRAPHICS
+from python_doom.settings import SimulationConfig as SIMULATION
+
+
+# columns of an action: -1, 0 or 1 to walk back or forth and to strafe
+# left or right, mouse movement in pixel to turn, 1 to shoot
+ACTIONS = ['move', 'strafe', 'turn', 'shoot']
+# columns of observation 'pose'
+POSE = ['x', 'y', 'heading', 'health']
+
+
+class AgentControls:
+    """Controls holding the last action of an agent, see `LiveControls`."""
+    finished = False
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.keys = dict.fromkeys(KEYS, False)
+        self.mouse_rel = 0
+        self.shoot = False
+
+    def act(self, action):
+        move, strafe, self.mouse_rel, shoot = action.tolist()
+        self.keys[pg.K_w], self.keys[pg.K_s] = move > 0, move < 0
+        self.keys[pg.K_d], self.keys[pg.K_a] = strafe > 0, strafe < 0
+        self.shoot = bool(shoot)
+
+    def events(self) -> list:
+        # NOTE: the shot is fired on the first tick of a step only
+        events = [SHOT] if self.shoot else []
+        self.shoot = False
+        return events
+
+    def frame_dt(self, frame_dt: float) -> float:
+        return frame_dt
+
+    def read(self) -> TickInput:
+        return TickInput(self.keys, self.mouse_rel)
+
+    def end_frame(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class RenderedMatch(Game):
+    """Match of `Game`, rendered on demand instead of in real time.
+
+    The view is cast with `number_rays` rays, which are observed as they
+    are, and upscaled to the window.
+    """
+
+    def __init__(self, controls, number_rays=GRAPHICS.number_rays):
+        super().__init__(controls)
+        # frames only depend on the simulated state
+        self.resolution = None
+        self.viewport.set_scale(number_rays / GRAPHICS.number_rays)
+        self.sim_clock.interpolate = False
+
+    def tick(self):
+        for event in self.controls.events():
+            self.player.check_shooting(event)
+        super().tick()
+
+    def _limit_frame_rate(self):
+        self.clock.tick()
+        return 0
+
+    def render(self):
+        pg.event.pump()
+        self.update()
+        self.draw()
+
+
+def buffer_specs(num_envs, number_rays, render) -> dict:
+    """Shape and type of all arrays shared by `VectorEnv` and its workers."""
+    specs = {
+        'depth': ((num_envs, number_rays), np.float32),
+        'texture': ((num_envs, number_rays), np.uint8),
+        'pose': ((num_envs, len(POSE)), np.float32),
+        'reward': ((num_envs,), np.float32),
+        'terminated': ((num_envs,), np.bool_),
+        'truncated': ((num_envs,), np.bool_),
+        'action': ((num_envs, len(ACTIONS)), np.int32),
+    }
+    if render:
+        specs['frame'] = ((num_envs, SCREEN.height, SCREEN.width, 3), np.uint8)
+    return specs
+
+
+def _views(raw, specs) -> dict:
+    return {
+        name: np.frombuffer(raw[name], dtype=dtype).reshape(shape)
+        for name, (shape, dtype) in specs.items()
+    }
+
+
+class EnvGroup:
+    """Envs `lo` up to `hi` of a `VectorEnv`, stepped by one process.
+
+    Every env keeps its own state of the global `random` module, which
+    npc draw from, so an env plays like a single `Match` of its seed.
+    """
+
+    def __init__(self, buffers, lo, hi, num_envs, render=False, frame_skip=1,
+                 max_steps=None):
+        self.buffers = buffers
+        self.lo, self.hi = lo, hi
+        self.num_envs = num_envs
+        self.render = render
+        self.frame_skip = frame_skip
+        self.max_steps = max_steps or \
+            int(SIMULATION.max_match_time * SIMULATION.tick_rate / frame_skip)
+
+        number_rays = buffers['depth'].shape[1]
+        self.ray_angles = -GRAPHICS.half_fov + \
+            GRAPHICS.field_of_view / number_rays * np.arange(number_rays)
+        self.fishbowl_correction = np.cos(self.ray_angles)
+
+        count = hi - lo
+        self.envs = [None] * count
+        self.controls = [None] * count
+        self.rng_states = [None] * count
+        self.episodes = np.zeros(count, dtype=int)
+        self.steps = np.zeros(count, dtype=int)
+        # health of all npc and of the player after the last step
+        self.npc_health = np.zeros(count)
+        self.player_health = np.zeros(count)
+        self.seed = 0
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.seed = seed
+            self.episodes[:] = 0
+        for idx in range(len(self.envs)):
+            self._reset(idx)
+        self._observe()
+
+    def _reset(self, idx):
+        seed = self.seed + self.lo + idx + \
+            int(self.episodes[idx]) * self.num_envs
+        self.episodes[idx] += 1
+        self.steps[idx] = 0
+
+        controls = self.controls[idx] = AgentControls(seed)
+        env = self.envs[idx] = RenderedMatch(controls, len(self.ray_angles)) \
+            if self.render else Match(seed, controls)
+        self.rng_states[idx] = random.getstate()
+        self.npc_health[idx] = np.maximum(env.npc_handler.health, 0).sum()
+        self.player_health[idx] = env.player.health
+
+    def step(self):
+        buffers = self.buffers
+        for idx, env in enumerate(self.envs):
+            k = self.lo + idx
+            self.controls[idx].act(buffers['action'][k])
+
+            random.setstate(self.rng_states[idx])
+            for _ in range(self.frame_skip):
+                if env.game_over:
+                    break
+                env.tick()
+            self.rng_states[idx] = random.getstate()
+            self.steps[idx] += 1
+
+            npc_health = np.maximum(env.npc_handler.health, 0).sum()
+            buffers['reward'][k] = (
+                self.npc_health[idx] - npc_health -
+                self.player_health[idx] + env.player.health
+            ) / 100
+            self.npc_health[idx] = npc_health
+            self.player_health[idx] = env.player.health
+
+            terminated = buffers['terminated'][k] = env.game_over
+            truncated = buffers['truncated'][k] = \
+                not terminated and self.steps[idx] >= self.max_steps
+            if terminated or truncated:
+                self._reset(idx)
+
+        self._observe()
+
+    def _observe(self):
+        """Cast the rays of all envs as one batch into the observations.
+
+        Rendered envs already cast their view, which is taken instead.
+        """
+        buffers = self.buffers
+        pose = np.array([
+            (env.player.x, env.player.y, env.player.heading, env.player.health)
+            for env in self.envs
+        ])
+        buffers['pose'][self.lo:self.hi] = pose
+
+        if self.render:
+            channels = rgb_channels(self.envs[0].screen)
+            for k, env in enumerate(self.envs, self.lo):
+                env.render()
+                buffers['depth'][k] = env.ray_caster.depths
+                buffers['texture'][k] = env.ray_caster.texture_ids
+                copy_rgb(env.screen, buffers['frame'][k], channels)
+            return
+
+        number_rays = len(self.ray_angles)
+        depth, texture_id, _ = cast_rays(
+            self.envs[0].map.grid,
+            np.repeat(pose[:, 0], number_rays),
+            np.repeat(pose[:, 1], number_rays),
+            (pose[:, 2, None] + self.ray_angles).ravel()
+        )
+        np.multiply(
+            depth.reshape(-1, number_rays), self.fishbowl_correction,
+            out=buffers['depth'][self.lo:self.hi], casting='unsafe'
+        )
+        buffers['texture'][self.lo:self.hi] = \
+            texture_id.reshape(-1, number_rays)
+
+
+def _work(conn, raw, specs, *group_args):
+    """Worker process, runs the commands of `VectorEnv` on its group."""
+    group = EnvGroup(_views(raw, specs), *group_args)
+    for command, args in iter(conn.recv, None):
+        getattr(group, command)(*args)
+        conn.send(True)
+
+
+class VectorEnv:
+    """`num_envs` matches stepped in lockstep by agents.
+
+    Every `step` takes one action per env, see `ACTIONS`, which is held
+    for `frame_skip` ticks. An env that terminates, won or lost, or is
+    truncated after `max_steps` is reset right away, so its observation
+    is the first one of the next episode. The reward is the npc health
+    removed minus the player health lost, per 100 health.
+
+    Observations are the per-ray depth, corrected like in `RayCasting`,
+    and texture id of the view, the pose and, if `render` is on, the
+    rendered frame as RGB. All returned arrays are the preallocated
+    buffers, valid until the next `step`.
+
+    Only casting the observed rays is batched over the envs, their
+    matches are still ticked one after another, at about 1 ms per env.
+    Expect several hundred steps per second and worker, from about 500
+    with 320 rays to 900 with 64 rays, and some 30 when rendering.
+    Throughput grows with the workers up to the number of cores.
+    """
+
+    def __init__(self, num_envs, seed=0, render=False, workers=1,
+                 frame_skip=1, number_rays=GRAPHICS.number_rays,
+                 max_steps=None):
+        if render:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+
+        self.num_envs = num_envs
+        self.seed = seed
+        specs = buffer_specs(num_envs, number_rays, render)
+        workers = max(1, min(workers, num_envs))
+        bounds = np.linspace(0, num_envs, workers + 1).astype(int).tolist()
+        group_args = [
+            (lo, hi, num_envs, render, frame_skip, max_steps)
+            for lo, hi in zip(bounds[:-1], bounds[1:])
+        ]
+
+        self.groups = []
+        self.workers = []
+        if workers == 1:
+            self.buffers = {
+                name: np.zeros(shape, dtype=dtype)
+                for name, (shape, dtype) in specs.items()
+            }
+            self.groups.append(EnvGroup(self.buffers, *group_args[0]))
+        else:
+            raw = {
+                name: mp.RawArray(
+                    'b', int(np.prod(shape)) * np.dtype(dtype).itemsize
+                )
+                for name, (shape, dtype) in specs.items()
+            }
+            self.buffers = _views(raw, specs)
+            for args in group_args:
+                conn, worker_conn = mp.Pipe()
+                process = mp.Process(
+                    target=_work, args=(worker_conn, raw, specs, *args),
+                    daemon=True
+                )
+                process.start()
+                self.workers.append((process, conn))
+
+        self.observations = {
+            name: self.buffers[name]
+            for name in ['depth', 'texture', 'pose', 'frame']
+            if name in self.buffers
+        }
+
+    def _run(self, command, *args):
+        for group in self.groups:
+            getattr(group, command)(*args)
+        for _, conn in self.workers:
+            conn.send((command, args))
+        for _, conn in self.workers:
+            conn.recv()
+
+    def reset(self, seed=None) -> dict:
+        self._run('reset', self.seed if seed is None else seed)
+        return self.observations
+
+    def step(self, actions) -> tuple:
+        """Returns observations, reward, terminated and truncated."""
+        np.copyto(self.buffers['action'], actions, casting='unsafe')
+        self._run('step')
+        return self.observations, self.buffers['reward'], \
+            self.buffers['terminated'], self.buffers['truncated']
+
+    def close(self):
+        for process, conn in self.workers:
+            conn.send(None)
+            process.join()
+        self.workers = []
+
+
+def random_actions(rng, num_envs) -> np.ndarray:
+    actions = np.empty((num_envs, len(ACTIONS)), dtype=np.int32)
+    actions[:, :2] = rng.integers(-1, 2, (num_envs, 2))
+    actions[:, 2] = rng.integers(-40, 41, num_envs)
+    actions[:, 3] = rng.random(num_envs) < 0.1
+    return actions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--envs', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--steps', type=int, default=1000)
+    parser.add_argument('--frame-skip', type=int, default=1)
+    parser.add_argument('--rays', type=int, default=GRAPHICS.number_rays,
+                        help='number of rays observed per env')
+    parser.add_argument('--render', action='store_true',
+                        help='also observe the rendered frames')
+    args = parser.parse_args()
+
+    env = VectorEnv(args.envs, render=args.render, workers=args.workers,
+                    frame_skip=args.frame_skip, number_rays=args.rays)
+    rng = np.random.default_rng(0)
+    env.reset()
+
+    start = time.perf_counter()
+    episodes = 0
+    for _ in range(args.steps):
+        _, _, terminated, truncated = env.step(random_actions(rng, args.envs))
+        episodes += int(np.count_nonzero(terminated | truncated))
+    total = time.perf_counter() - start
+    env.close()
+
+    print(f'{args.envs} envs on {args.workers} workers, '
+          f'{args.steps * args.envs / total:.0f} steps/s, '
+          f'{episodes} episodes finished')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,57 @@
+import random
 import sys
+import time
 
 import pygame as pg
 
 from python_doom.settings import ScreenConfig as SCREEN
 from python_doom.settings import GraphicsConfig as GRAPHICS
+from python_doom.settings import CaptureConfig as CAPTURE
+from python_doom.assets import AssetCache, FrameRegistry
+from python_doom.capture import FrameCapture
+from python_doom.clock import SimulationClock
+from python_doom.controls import LiveControls
+from python_doom.loader import AssetLoader
 from python_doom.maps import Maps
 from python_doom.npc import NpcHandler
 from python_doom.player import Player
 from python_doom.path_finding import PathFinding
+from python_doom.profiler import FrameProfiler
+from python_doom.pvs import PotentiallyVisibleSet
 from python_doom.ray_casting import RayCasting
-from python_doom.rendering import Renderer
+from python_doom.rendering import DirtyRects, Renderer
 from python_doom.sprites import SpritesHandler
 from python_doom.sounds import Sounds
+from python_doom.viewport import ResolutionController, Viewport
 from python_doom.weapons import Weapon
 
 
 class Game:
-    dt = 1e-16
+    frame_dt = 0  # ms
+    frame_work = 0.0  # s spent on the last frame, without waiting
+
+    # simulated in this order every tick
+    SIMULATED_SUBSYSTEMS = [
+        'player', 'sprites_handler', 'npc_handler', 'weapon'
+    ]
+    # updated in this order every rendered frame
+    SUBSYSTEMS = [
+        'player', 'ray_caster', 'sprites_handler', 'npc_handler', 'weapon'
+    ]
+    # stage of `FrameProfiler` each subsystem is accounted to
+    PROFILER_STAGES = {
+        'player': 'player',
+        'ray_caster': 'ray_casting',
+        'sprites_handler': 'sprites',
+        'npc_handler': 'npc_logic',
+        'weapon': 'weapon'
+    }
+
+    def __init__(self, controls=None):
+        # input and seed of the session, live or replayed
+        self.controls = controls or LiveControls()
+        random.seed(self.controls.seed)
 
-    def __init__(self):
         pg.init()
         pg.mouse.set_visible(False)
         self.screen = pg.display.set_mode([
@@ -26,70 +59,168 @@ class Game:
             SCREEN.height
         ])
         self.clock = pg.time.Clock()
+        self.sim_clock = SimulationClock()
+        self.dt = self.sim_clock.dt
+        self.profiler = FrameProfiler()
+        self.capture = FrameCapture(self.screen)
+        self.viewport = Viewport(self.screen)
+        self.resolution = ResolutionController(self.viewport) \
+            if GRAPHICS.dynamic_resolution and not GRAPHICS.mode_2d else None
+        self.assets = AssetCache()
+        self.asset_loader = AssetLoader(self.assets)
+        if self.asset_loader.workers:
+            self.asset_loader.load()
+        self.frames = FrameRegistry(self.assets)
         self._new_game()
 
         self.sprites_handler = SpritesHandler(self)
         self.npc_handler = NpcHandler(self)
         self.renderer = Renderer(self)
         self.ray_caster = RayCasting(self)
+        self.dirty_rects = DirtyRects(self.screen, self._background_2d()) \
+            if GRAPHICS.mode_2d and GRAPHICS.dirty_rects else None
+        self.assets.save()
+        self.assets.decoded.clear()
+        if CAPTURE.enabled:
+            self.capture.start()
 
     def _new_game(self):
         self.map = Maps(self)
+        self.pvs = PotentiallyVisibleSet(self.map) \
+            if GRAPHICS.pvs_culling else None
         self.path_finding = PathFinding(self)
         self.player = Player(self)
         self.weapon = Weapon(self)
         self.sounds = Sounds(self)
         self.sounds.theme.play(-1)
 
+    def _background_2d(self) -> pg.Surface:
+        background = pg.Surface(self.screen.get_size(), 0, self.screen)
+        self.map.draw(background)
+        return background
+
+    def mark_dirty(self, rect):
+        """Mark part of the window as drawn for the next display update."""
+        if self.dirty_rects is not None:
+            self.dirty_rects.add(rect)
+
     def _check_game_logic(self) -> bool:
         if self.player.health <= 0:
             self.renderer.render_loss()
             return False
 
-        if len([npc for npc in self.npc_handler.all_npc if npc.alive]) <= 0:
+        if self.npc_handler.alive_count <= 0:
             self.renderer.render_win()
             return False
 
         return True
 
+    @property
+    def game_over(self) -> bool:
+        return self.player.health <= 0 or \
+            self.npc_handler.alive_count <= 0
+
+    def tick(self):
+        """Advance the simulation by one fixed time step of `dt`."""
+        if self.game_over:
+            return
+
+        for name in self.SIMULATED_SUBSYSTEMS:
+            self._tick_subsystem(name)
+        self.sim_clock.step()
+
+    def step(self, ticks=1):
+        """Advance the simulation without waiting for real time."""
+        for _ in range(ticks):
+            self.tick()
+
     def update(self):
+        frame_start = time.perf_counter()
         if self._check_game_logic():
-            self.player.update()
-            self.ray_caster.update()
-            self.sprites_handler.update()
-            self.npc_handler.update()
-            self.weapon.update()
-        pg.display.flip()
-
-        self.dt = self.clock.tick(SCREEN.fps if SCREEN.lock_fps else 1e1)
+            for name in self.SUBSYSTEMS:
+                self._update_subsystem(name)
+
+        start = self.profiler.start()
+        if self.dirty_rects is not None:
+            self.dirty_rects.update()
+        else:
+            pg.display.flip()
+        self.profiler.stop('display', start)
+        start = self.profiler.start()
+        self.capture.capture()
+        self.profiler.stop('capture', start)
+        self.frame_work = time.perf_counter() - frame_start
+
+        self.frame_dt = self._limit_frame_rate()
 
         caption = \
             f'{self.clock.get_fps() :.1f} - ' + \
             f'{self.player.x :.1f} {self.player.y :.1f} ' + \
-            f'{self.player.heading :.2f}'
+            f'{self.player.heading :.2f} - ' + \
+            f'{self.viewport.scale :.0%}'
         pg.display.set_caption(caption)
 
+    def _update_subsystem(self, name):
+        start = self.profiler.start()
+        getattr(self, name).update()
+        self.profiler.stop(self.PROFILER_STAGES[name], start)
+
+    def _tick_subsystem(self, name):
+        start = self.profiler.start()
+        getattr(self, name).tick()
+        self.profiler.stop(self.PROFILER_STAGES[name], start)
+
+    def _limit_frame_rate(self):
+        return self.clock.tick(SCREEN.fps if SCREEN.lock_fps else 1e1)
+
     def draw(self):
-        if GRAPHICS.mode_2d:
+        start = time.perf_counter()
+        if self.dirty_rects is not None:
+            self.dirty_rects.clear()
+        elif GRAPHICS.mode_2d:
             self.screen.fill((0, 0, 0))
         self.renderer.draw()
-        self.map.draw()
+        if self.dirty_rects is None:
+            self.map.draw()
+
+        self.frame_work += time.perf_counter() - start
+        if self.resolution is not None:
+            self.resolution.update(self.frame_work * 1e3)
+        self.profiler.record('resolution_scale', self.viewport.scale)
 
     def check_events(self):
-        for event in pg.event.get():
+        for event in self.controls.events():
             if event.type == pg.QUIT:
                 self._quit()
             if event.type == pg.KEYDOWN and event.key == pg.K_ESCAPE:
                 self._quit()
             self.player.check_shooting(event)
+            self.profiler.check_events(event)
+            self.capture.check_events(event)
 
-    @staticmethod
-    def _quit():
+    def _quit(self):
+        self.controls.close()
+        self.capture.stop()
         pg.quit()
         sys.exit()
 
-    def run(self):
-        while True:
+    def run(self, render=True):
+        """Main loop, simulates as fast as possible if `render` is off.
+
+        Returns when the input of the controls is finished.
+        """
+        while not self.controls.finished:
             self.check_events()
+            frame_dt = self.controls.frame_dt(
+                self.frame_dt if render else self.dt
+            )
+            self.step(self.sim_clock.advance(frame_dt))
+            self.controls.end_frame()
+            if not render:
+                continue
+
             self.update()
             self.draw()
+            self.profiler.end_frame()
+
+        self.capture.stop()
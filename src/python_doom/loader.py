@@ -0,0 +1,73 @@
+import time
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pygame as pg
+
+from python_doom.assets import IMAGE_DIRS, SOUND_DIR, asset_files, asset_group
+from python_doom.settings import GraphicsConfig as GRAPHICS
+
+
+class AssetLoader:
+    """Loads all assets into an `AssetCache` with a pool of threads.
+
+    Workers read baked images from the cache file, or decode all images
+    when there is none yet, and load all sounds. Conversion of images to
+    the display format is done on the main thread as soon as a worker is
+    done. Subsystems then find their assets already resident.
+    """
+
+    def __init__(self, assets, workers=GRAPHICS.asset_loader_workers):
+        self.assets = assets
+        self.workers = workers
+        # time in ms per asset group, summed over all of its files
+        self.times = defaultdict(lambda: {'files': 0, 'load': 0.0, 'finalize': 0.0})
+        self.total = 0.0
+
+    def load(self) -> dict:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self.workers) as pool:
+            futures = [
+                pool.submit(self._timed, 'baked', self.assets.read_baked, key)
+                for key in self.assets.baked_keys
+            ]
+            if not futures:
+                futures = [
+                    pool.submit(self._timed, 'image', self.assets.decode, path)
+                    for path in asset_files(IMAGE_DIRS, '.png')
+                ]
+            futures += [
+                pool.submit(self._timed, 'sound', pg.mixer.Sound, path)
+                for path in asset_files([SOUND_DIR], '.wav')
+            ]
+
+            for future in as_completed(futures):
+                self._finalize(*future.result())
+
+        self.total = (time.perf_counter() - start) * 1e3
+        return dict(self.times)
+
+    @staticmethod
+    def _timed(kind, load, name):
+        start = time.perf_counter()
+        asset = load(name)
+        return kind, name, asset, (time.perf_counter() - start) * 1e3
+
+    def _finalize(self, kind, name, asset, load_time):
+        start = time.perf_counter()
+        if kind == 'baked':
+            group = name.split(':')[0]
+            self.assets.add(name, asset)
+        elif kind == 'image':
+            # NOTE: scaling is left to the first request of each size
+            group = asset_group(name)
+            self.assets.decoded[name] = asset
+        else:
+            group = asset_group(name)
+            self.assets.sounds[name] = asset
+
+        times = self.times[group]
+        times['files'] += 1
+        times['load'] += load_time
+        times['finalize'] += (time.perf_counter() - start) * 1e3
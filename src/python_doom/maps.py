@@ -1,5 +1,8 @@
+import numpy as np
 import pygame as pg
 
+from collections.abc import Mapping
+
 from python_doom.settings import GraphicsConfig as GRAPHICS
 
 COLOR_RECT_2D = (100, 100, 100)
@@ -42,27 +45,76 @@ tile_map = [
 ]
 
 
+class ObstructedTiles(Mapping):
+    """Read-only `{(x, y): texture_id}` view on the texture grid of a map.
+
+    Kept for compatibility, hot paths should use the grid of `Maps`.
+    """
+
+    def __init__(self, map):
+        self.map = map
+
+    def __getitem__(self, tile):
+        texture_id = self.map.texture_id(*tile)
+        if not texture_id:
+            raise KeyError(tile)
+        return texture_id
+
+    def __contains__(self, tile):
+        return self.map.texture_id(*tile) > 0
+
+    def __iter__(self):
+        for y, x in np.argwhere(self.map.grid).tolist():
+            yield x, y
+
+    def __len__(self):
+        return int(np.count_nonzero(self.map.grid))
+
+
 class Maps:
     def __init__(self, game):
         self.game = game
         self.tiles = tile_map
-        self.obstructed_tiles = {}
-        self.free_tiles = []
+        self.obstructed_tiles = ObstructedTiles(self)
         self.parse_mini_map()
 
     def parse_mini_map(self):
-        for y, row in enumerate(self.tiles):
-            for x, value in enumerate(row):
-                if value:
-                    self.obstructed_tiles[(x, y)] = value
-                else:
-                    self.free_tiles.append((x, y))
-
-    def draw(self):
+        # texture id per tile indexed by [y, x], 0 for free tiles
+        self.grid = np.array(self.tiles, dtype=np.uint8)
+        self.height, self.width = self.grid.shape
+        self.walkable = self.grid == 0
+
+        # NOTE: nested lists are faster than NumPy for single lookups
+        self._rows = self.grid.tolist()
+
+        self.free_tiles = [(x, y) for y, x in np.argwhere(self.walkable).tolist()]
+        self.free_tile_index = np.full(self.grid.shape, -1, dtype=np.int32)
+        self.free_tile_index[self.walkable] = np.arange(len(self.free_tiles))
+
+    def texture_id(self, x: int, y: int) -> int:
+        """Texture id of tile, 0 for free tiles and outside of the map."""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self._rows[y][x]
+        return 0
+
+    def is_free(self, x: int, y: int) -> bool:
+        return not self.texture_id(x, y)
+
+    def free_mask(self, xs, ys) -> np.ndarray:
+        """Vectorized `is_free` for arrays of tile coordinates."""
+        xs, ys = np.asarray(xs, dtype=np.intp), np.asarray(ys, dtype=np.intp)
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        # NOTE: `np.clip` costs more than the lookup itself on few tiles
+        return ~inside | self.walkable[
+            np.minimum(np.maximum(ys, 0), self.height - 1),
+            np.minimum(np.maximum(xs, 0), self.width - 1)
+        ]
+
+    def draw(self, surface=None):
         if GRAPHICS.mode_2d:
             y = self.game.player.position[1]
             [pg.draw.rect(
-                self.game.screen,
+                surface or self.game.screen,
                 COLOR_RECT_2D,
                 (pos[0] * TILE_SIZE, pos[1] * TILE_SIZE, TILE_SIZE, TILE_SIZE),
                 2
@@ -1,238 +1,36 @@
 from __future__ import annotations
 
+import math
+
 import numpy as np
 import pygame as pg
 
-from random import choices, choice, random
+from random import choices, random, sample
 
-from python_doom.sprites import AnimatedObject
+from python_doom.sprites import SpriteObject
+from python_doom.clock import lerp
 from python_doom.maps import TILE_SIZE
-from python_doom.path_finding import manhattan_dist
+from python_doom.occupancy import OccupancyIndex
+from python_doom.rendering import RenderedObject
 
 from python_doom.settings import GraphicsConfig as GRAPHICS
 from python_doom.settings import ScreenConfig as SCREEN
+from python_doom.settings import PlayerConfig as PLAYER
 from python_doom.settings import Difficulty as DIFFICULTY
 
 
-class Npc(AnimatedObject):
-    alive = True
-    in_pain = False
-
-    attacking = False
-    player_within_sight = False
-    player_pursuit = False
-    path_to_player = []
-
-    def __init__(self, game,
-                 path, pos, animation_time, scale, height_shift,
-                 speed, size, health, damage, accuracy):
-        super().__init__(game, path, pos, animation_time, scale, height_shift)
-
-        self.x, self.y = pos
-        self.path = path
-        self._read_all_animations()
-
-        self.speed = speed
-        self.size = size
-        self.health = health
-        self.damage = damage
-        self.accuracy = accuracy
-
-    def _read_all_animations(self):
-        self.images_attack = self.grab_images(self.path + '/attack')
-        self.images_death = self.grab_images(self.path + '/death')
-        self.images_idle = self.grab_images(self.path + '/idle')
-        self.images_pain = self.grab_images(self.path + '/pain')
-        self.images_walk = self.grab_images(self.path + '/walk')
-
-    def update(self):
-        self._npc_main_logic()
-
-        if GRAPHICS.mode_2d:
-            self._draw_2d()
-        return super().update()
-
-    def _npc_main_logic(self):
-        if not self.alive:
-            # animation finish loops shortly to first frame of animation,
-            # therefor we must take care ourself
-            # if self.animation_finished:
-            if self.animation_counter >= len(self.images_death)-1:
-                self.images = [self.images_death[-1]]
-                self.image = self.images_death[-1]
-            return
-
-        if self.attacking:
-            if self.animation_finished:
-                self.attacking = False
-                if random() < self.accuracy:
-                    self.player.take_damage(self.damage)
-
-        if self.in_pain:
-            self.in_pain = False
-
-        self.player_within_sight = self._check_line_of_sight()
-        self._check_hit_from_player()
-
-        if self.in_pain:
-            self.image = self.images_pain[0]
-
-            self.health -= self.game.weapon.damage
-            self._check_health()
-            if self.alive:
-                self.game.sounds.npc_pain.play()
-            return
-
-        if self.player_within_sight:
-            self.player_pursuit = True
-            # TODO: conditions to stop pursuing
-            if self.dist_player < self.attack_distance:
-                self._attack()
-                return
-
-        if self.player_pursuit:
-            self.images = self.images_walk
-            self.path_to_player = self.game.path_finding.get_path(
-                self.tile_position, self.player.tile_position
-            )
-
-            self._movement()
-            return
-
-        self.images = self.images_idle
-
-    def _check_health(self):
-        if self.health < 1:
-            self.alive = False
-            self.game.sounds.npc_death.play()
-
-            self.images = self.images_death
-            self.animation_counter = 0
-            if self.animation_finished:
-                self.animation_finished = False
-            self.animation_time *= 0.8
-
-    def _check_hit_from_player(self):
-        if self.player.shot_fired:
-            x_left = SCREEN.half_height - self.IMAGE_HALF_WIDTH
-            x_right = SCREEN.half_width + self.IMAGE_HALF_WIDTH
-            if x_left < self.x_screen < x_right:
-                if not self.player_within_sight:
-                    return
-                self.in_pain = True
-
-    def _check_line_of_sight(self):
-        if self.player.health <= 0:
-            return False
-
-        if self.player.tile_position == self.tile_position:
-            return False
-
-        self.dist_player = np.linalg.norm(
-            np.array([self.player.position]) -
-            np.array([self.position])
-        )
-        self.theta = np.arctan2(
-            self.position[1]-self.player.position[1],
-            self.position[0]-self.player.position[0]
-        )
-        dist_wall, _, _ = self.game.ray_caster.cast_ray(
-            np.sin(self.theta),
-            np.cos(self.theta)
-        )
-        return self.dist_player < dist_wall
-
-    def _movement(self):
-        # NOTE: penultimate tile is the next tile on the path to target
-        target = self.path_to_player[-min(2, len(self.path_to_player))]
-        if target in self.game.npc_handler.npc_positions:
-            return
-
-        if manhattan_dist(target, self.player.tile_position) < 2:
-            return
-
-        if not self.player_within_sight:
-            # NOTE: 0.5 are added to target middle of tile
-            theta = np.arctan2(
-                self.position[1] - (target[1]+0.5),
-                self.position[0] - (target[0]+0.5)
-            )
-        else:
-            theta = np.arctan2(
-                self.position[1]-self.player.position[1],
-                self.position[0]-self.player.position[0]
-            )
-
-        dx = np.cos(theta+np.pi) * self.speed
-        dy = np.sin(theta+np.pi) * self.speed
-
-        self._check_collisions(dx, dy)
-
-    def _attack(self):
-        if self.animation_finished:
-            self.images = self.images_attack
-            self.image = self.images_attack[0]
-            self.animation_counter = 0
-            self.animation_finished = False
-            self.attacking = True
-            # self.game.sounds.npc_attack.play()
-
-    def _draw_2d(self):
-        LINE_WIDTH = 2
-        COLOR = (255, 87, 51)
-        RADIUS = 15
-
-        if GRAPHICS.debug_line_of_sight:
-            pg.draw.line(
-                self.game.screen, COLOR,
-                (self.x * TILE_SIZE, self.y * TILE_SIZE),
-                (self.player.x * TILE_SIZE, self.player.y * TILE_SIZE),
-                LINE_WIDTH
-            )
-        pg.draw.circle(
-            self.game.screen, COLOR,
-            (int(self.x * TILE_SIZE), int(self.y * TILE_SIZE)),
-            RADIUS
-        )
-
-        [pg.draw.rect(
-            self.game.screen,
-            (100, 250, 18),
-            (pos[0] * TILE_SIZE, pos[1] * TILE_SIZE, TILE_SIZE, TILE_SIZE),
-            2
-        ) for pos in self.path_to_player]
-
-    def _check_for_walls(self, x, y):
-        for xs, ys in [(1, 1), (1, -1), (-1, -1), (-1, 1)]:
-            dx = xs * self.size
-            dy = ys * self.size
-            if (int(x+dx), int(y+dy)) in self.game.map.obstructed_tiles:
-                return False
-        return True
-
-    def _check_for_npc(self, x, y) -> bool:
-        for position in self.game.npc_handler.npc_positions:
-            if position == self.tile_position:
-                continue
-            if manhattan_dist(position, (int(x), int(y))) <= 1:
-                return False
-        return True
-
-    def _check_collisions(self, dx, dy):
-        if self._check_for_walls(self.x + dx, self.y) and \
-           self._check_for_npc(self.x + dx, self.y):
-            self.x += dx
-        if self._check_for_walls(self.x, self.y + dy) and \
-           self._check_for_npc(self.x, self.y + dy):
-            self.y += dy
-
-    @property
-    def position(self):
-        return self.x, self.y
-
-    @property
-    def tile_position(self):
-        return int(self.x), int(self.y)
+class Npc:
+    """Parameters of a type of npc, one row of the arrays of `NpcHandler`."""
+    path = None
+    animation_time = 0
+    scale = 1.0
+    height_shift = 0.0
+    speed = 0.0
+    size = 0.0
+    health = 0
+    damage = 0
+    attack_distance = 0
+    accuracy = 0.0
 
 
 class Soldier(Npc):
@@ -248,13 +46,6 @@ class Soldier(Npc):
     attack_distance = 4
     accuracy = 0.35
 
-    def __init__(self, game, pos):
-        super().__init__(
-            game, self.path, pos, self.animation_time, self.scale,
-            self.height_shift, self.speed, self.size, self.health,
-            self.damage, self.accuracy
-        )
-
 
 class CacoDemon(Npc):
 
@@ -269,13 +60,6 @@ class CacoDemon(Npc):
     attack_distance = 3
     accuracy = 0.15
 
-    def __init__(self, game, pos):
-        super().__init__(
-            game, self.path, pos, self.animation_time, self.scale,
-            self.height_shift, self.speed, self.size, self.health,
-            self.damage, self.accuracy
-        )
-
 
 class CyberDemon(Npc):
 
@@ -290,54 +74,440 @@ class CyberDemon(Npc):
     attack_distance = 5.5
     accuracy = 0.25
 
-    def __init__(self, game, pos):
-        super().__init__(
-            game, self.path, pos, self.animation_time, self.scale,
-            self.height_shift, self.speed, self.size, self.health,
-            self.damage, self.accuracy
-        )
-
 
 class NpcHandler:
-    all_npc = []
+    """State of all npc as struct of arrays, one entry per npc.
+
+    Every tick updates line of sight, hits, attacks, movement and
+    animation of all npc in vectorized passes. Per-type parameters are
+    gathered into per-npc arrays once on spawning.
+    """
     objects_to_render = []
 
     NPC_TYPES = [Soldier, CacoDemon, CyberDemon]
+    PARAMETERS = [
+        'animation_time', 'scale', 'height_shift', 'speed', 'size',
+        'health', 'damage', 'attack_distance', 'accuracy'
+    ]
+
+    # animation states, index of the images per type
+    ANIMATIONS = ['idle', 'walk', 'attack', 'pain', 'death']
+    IDLE, WALK, ATTACK, PAIN, DEATH = range(len(ANIMATIONS))
+    # corners of the square of `size` around a npc, checked for walls
+    CORNERS = np.array([(1, 1), (1, -1), (-1, -1), (-1, 1)])
 
     def __init__(self, game):
         self.game = game
+        self.player = game.player
+        self.occupancy = OccupancyIndex(game.map.grid.shape)
 
+        self._load_types()
         self.populate_map()
 
+    def _load_types(self):
+        frames = self.game.frames
+        self.images = [
+            [frames.acquire(f'{npc_type.path}/{animation}')
+             for animation in self.ANIMATIONS]
+            for npc_type in self.NPC_TYPES
+        ]
+        self.image_counts = np.array(
+            [[len(images) for images in type_images]
+             for type_images in self.images]
+        )
+
+        # NOTE: like for sprites, size is given by first image of a type
+        # which is the only file in the directory of the type
+        first_images = [
+            frames.acquire(npc_type.path)[0]
+            for npc_type in self.NPC_TYPES
+        ]
+        self.type_image_half_width = np.array(
+            [image.get_width() // 2 for image in first_images]
+        )
+        self.type_image_ratio = np.array(
+            [image.get_width() / image.get_height() for image in first_images]
+        )
+
+    @property
+    def npc_positions(self):
+        return self.occupancy
+
+    @property
+    def occupancy_version(self):
+        return self.occupancy.version
+
+    def _potentially_visible(self, tile, xs, ys) -> np.ndarray:
+        if self.game.pvs is None:
+            return np.ones(len(xs), dtype=bool)
+        return self.game.pvs.visible_mask(tile, xs, ys)
+
+    @property
+    def alive_count(self) -> int:
+        return int(np.count_nonzero(self.alive))
+
+    def populate_map(self):
+        x_player, y_player = self.player.tile_position
+        # NOTE: distance to player is the absolute of the summed distances
+        free_tiles = [
+            (x, y) for x, y in self.game.map.free_tiles
+            if abs(x - x_player + y - y_player) > DIFFICULTY.min_npc_spawn_dist
+        ]
+
+        # more npc than tiles have to share them
+        num_npc = DIFFICULTY.num_nps
+        positions = sample(free_tiles, min(num_npc, len(free_tiles)))
+        positions += choices(free_tiles, k=num_npc - len(positions))
+        type_ids = choices(
+            range(len(self.NPC_TYPES)), DIFFICULTY.npc_ratio, k=num_npc
+        )
+
+        self._spawn(positions, type_ids)
+
+    def _spawn(self, positions, type_ids):
+        num_npc = len(positions)
+        self.type_ids = np.array(type_ids, dtype=np.intp).reshape(num_npc)
+
+        for name in self.PARAMETERS:
+            row = np.array([getattr(t, name) for t in self.NPC_TYPES])
+            setattr(self, name, row[self.type_ids].astype(float))
+        self.image_half_width = self.type_image_half_width[self.type_ids]
+        self.image_ratio = self.type_image_ratio[self.type_ids]
+
+        tiles = np.array(positions, dtype=np.intp).reshape(num_npc, 2)
+        self.x = tiles[:, 0] + 0.5
+        self.y = tiles[:, 1] + 0.5
+        # position before the last simulation tick
+        self.prev_x = self.x.copy()
+        self.prev_y = self.y.copy()
+        # tiles registered in the occupancy index
+        self.tile_x = tiles[:, 0].copy()
+        self.tile_y = tiles[:, 1].copy()
+        for tile in positions:
+            self.occupancy.add(tuple(tile))
+
+        self.alive = np.ones(num_npc, dtype=bool)
+        self.player_within_sight = np.zeros(num_npc, dtype=bool)
+        self.player_pursuit = np.zeros(num_npc, dtype=bool)
+        self.attacking = np.zeros(num_npc, dtype=bool)
+        self.dist_player = np.full(num_npc, np.inf)
+        self.theta = np.zeros(num_npc)
+
+        self.state = np.full(num_npc, self.IDLE, dtype=np.intp)
+        self.animation_counter = np.zeros(num_npc, dtype=np.intp)
+        self.animation_finished = np.ones(num_npc, dtype=bool)
+        self.animation_prev_time = np.full(num_npc, self.game.sim_clock.time)
+        # pain image is shown until the next animation step
+        self.show_pain = np.zeros(num_npc, dtype=bool)
+        # npc the tile of the player could possibly see
+        self.potentially_visible = np.ones(num_npc, dtype=bool)
+
+        self.paths_to_player = [[] for _ in range(num_npc)]
+
+    def tick(self):
+        if not len(self.x):
+            return
+
+        self.prev_x[:] = self.x
+        self.prev_y[:] = self.y
+        self.potentially_visible = self._potentially_visible(
+            self.player.tile_position,
+            self.x.astype(np.intp), self.y.astype(np.intp)
+        )
+
+        self._finish_attacks()
+        self._check_line_of_sight()
+        in_pain = self._check_hit_from_player()
+        self._take_damage(in_pain)
+
+        active = self.alive & ~in_pain
+        self.player_pursuit |= active & self.player_within_sight
+        attack = active & self.player_within_sight & \
+            (self.dist_player < self.attack_distance)
+        self._attack(attack)
+
+        walking = active & self.player_pursuit & ~attack
+        self.state[walking] = self.WALK
+        self.state[active & ~self.player_pursuit & ~attack] = self.IDLE
+        self._movement(np.flatnonzero(walking))
+
+        self._animate()
+        self._update_occupancy()
+
+    def _finish_attacks(self):
+        finished = np.flatnonzero(
+            self.alive & self.attacking & self.animation_finished
+        )
+        self.attacking[finished] = False
+        for idx in finished.tolist():
+            if random() < self.accuracy[idx]:
+                self.player.take_damage(int(self.damage[idx]))
+
+    def _check_line_of_sight(self):
+        x_player, y_player = self.player.position
+        self.theta = np.arctan2(self.y - y_player, self.x - x_player)
+
+        self.player_within_sight[:] = False
+        if self.player.health <= 0:
+            return
+
+        x_tile, y_tile = self.player.tile_position
+        idx = np.flatnonzero(
+            self.alive & self.potentially_visible &
+            ((self.tile_x != x_tile) | (self.tile_y != y_tile))
+        )
+        if not len(idx):
+            return
+
+        # one query for all npc, rays are casted from the player to them
+        visible, self.dist_player[idx] = self.game.ray_caster.line_of_sight(
+            (x_player, y_player), np.column_stack((self.x[idx], self.y[idx]))
+        )
+        self.player_within_sight[idx] = visible
+
+    def _check_hit_from_player(self) -> np.ndarray:
+        if not self.player.shot_fired:
+            return np.zeros(len(self.x), dtype=bool)
+
+        delta = (self.theta - self.player.heading + math.pi) % math.tau - math.pi
+        x_screen = (GRAPHICS.half_number_rays + delta / GRAPHICS.delta_angle) * \
+            GRAPHICS.scaling
+        x_left = SCREEN.half_width - self.image_half_width
+        x_right = SCREEN.half_width + self.image_half_width
+
+        return self.alive & self.player_within_sight & \
+            (x_left < x_screen) & (x_screen < x_right)
+
+    def _take_damage(self, in_pain):
+        idx = np.flatnonzero(in_pain)
+        if not len(idx):
+            return
+
+        self.show_pain[idx] = True
+        self.health[idx] -= self.game.weapon.damage
+
+        died = idx[self.health[idx] < 1]
+        self.alive[died] = False
+        self.show_pain[died] = False
+        self.state[died] = self.DEATH
+        self.animation_counter[died] = 0
+        self.animation_finished[died] = False
+        self.animation_time[died] *= 0.8
+
+        if len(died):
+            self.game.sounds.npc_death.play()
+        if len(died) < len(idx):
+            self.game.sounds.npc_pain.play()
+
+    def _attack(self, attack):
+        start = attack & self.animation_finished
+        self.state[start] = self.ATTACK
+        self.animation_counter[start] = 0
+        self.animation_finished[start] = False
+        self.attacking[start] = True
+        # self.game.sounds.npc_attack.play()
+
+    def _movement(self, idx):
+        if not len(idx):
+            return
+
+        x_player, y_player = self.player.tile_position
+        targets = np.empty((len(idx), 2), dtype=np.intp)
+        for row, (npc, x, y) in enumerate(zip(
+                idx.tolist(), self.tile_x[idx].tolist(),
+                self.tile_y[idx].tolist())):
+            path = self.game.path_finding.get_path((x, y), (x_player, y_player))
+            self.paths_to_player[npc] = path
+            # NOTE: penultimate tile is the next tile on the path to target
+            targets[row] = path[-min(2, len(path))]
+
+        x_target, y_target = targets.T
+        moving = ~self.occupancy.occupied_mask(x_target, y_target) & \
+            (np.abs(x_target - x_player) + np.abs(y_target - y_player) >= 2)
+        idx = idx[moving]
+        x_target, y_target = x_target[moving], y_target[moving]
+
+        # NOTE: 0.5 are added to target middle of tile
+        x_goal = np.where(
+            self.player_within_sight[idx], self.player.x, x_target + 0.5
+        )
+        y_goal = np.where(
+            self.player_within_sight[idx], self.player.y, y_target + 0.5
+        )
+        theta = np.arctan2(self.y[idx] - y_goal, self.x[idx] - x_goal)
+
+        dx = np.cos(theta + np.pi) * self.speed[idx]
+        dy = np.sin(theta + np.pi) * self.speed[idx]
+
+        self._check_collisions(idx, dx, dy)
+
+    def _check_for_walls(self, x, y, size):
+        # all four corners of all npc in one lookup
+        return self.game.map.free_mask(
+            np.trunc(x + self.CORNERS[:, :1] * size),
+            np.trunc(y + self.CORNERS[:, 1:] * size)
+        ).all(axis=0)
+
+    def _check_for_npc(self, x_from, y_from, x, y):
+        return ~self.occupancy.neighbourhood_mask(
+            x.astype(np.intp), y.astype(np.intp),
+            x_from.astype(np.intp), y_from.astype(np.intp)
+        )
+
+    def _check_collisions(self, idx, dx, dy):
+        # NOTE: all npc check against the occupancy at the start of the tick
+        x, y = self.x[idx], self.y[idx]
+        size = self.size[idx]
+
+        x_new = x + dx
+        x = np.where(
+            self._check_for_walls(x_new, y, size) &
+            self._check_for_npc(x, y, x_new, y),
+            x_new, x
+        )
+        y_new = y + dy
+        y = np.where(
+            self._check_for_walls(x, y_new, size) &
+            self._check_for_npc(x, y, x, y_new),
+            y_new, y
+        )
+
+        self.x[idx] = x
+        self.y[idx] = y
+
+    def _animate(self):
+        now = self.game.sim_clock.time
+        trigger = now - self.animation_prev_time > self.animation_time
+        # hidden npc pause, but finish their attack
+        trigger &= self.potentially_visible | self.attacking
+        self.animation_prev_time[trigger] = now
+        self.show_pain[trigger] = False
+
+        # dead npc stop at the last image of their death
+        counts = self.image_counts[self.type_ids, self.state]
+        trigger &= self.alive | (self.animation_counter < counts - 1)
+
+        counter = (self.animation_counter[trigger] + 1) % counts[trigger]
+        self.animation_counter[trigger] = counter
+        self.animation_finished[trigger] = counter == 0
+
+    def _update_occupancy(self):
+        died = np.flatnonzero(~self.alive & (self.tile_x >= 0))
+        for x, y in zip(self.tile_x[died].tolist(), self.tile_y[died].tolist()):
+            self.occupancy.remove((x, y))
+        self.tile_x[died] = self.tile_y[died] = -1
+
+        x_tiles = self.x.astype(np.intp)
+        y_tiles = self.y.astype(np.intp)
+        moved = np.flatnonzero(
+            self.alive & ((x_tiles != self.tile_x) | (y_tiles != self.tile_y))
+        )
+        for npc in moved.tolist():
+            self.occupancy.move(
+                (int(self.tile_x[npc]), int(self.tile_y[npc])),
+                (int(x_tiles[npc]), int(y_tiles[npc]))
+            )
+        self.tile_x[moved] = x_tiles[moved]
+        self.tile_y[moved] = y_tiles[moved]
+
+    def _image(self, npc):
+        type_id = self.type_ids[npc]
+        if self.show_pain[npc]:
+            return self.images[type_id][self.PAIN][0]
+        state = self.state[npc]
+        images = self.images[type_id][state]
+        return images[self.animation_counter[npc] % len(images)]
+
     def update(self):
         self.objects_to_render = []
+        if not len(self.x):
+            return
 
-        for npc in self.all_npc:
-            self.npc_positions = \
-                [npc.tile_position for npc in self.all_npc
-                 if npc.alive and
-                    npc.tile_position is not self.game.player.tile_position]
+        if GRAPHICS.mode_2d:
+            self._draw_2d()
 
-            obj = npc.update()
-            if obj:
-                self.objects_to_render.append(obj)
+        alpha = self.game.sim_clock.alpha
+        x = lerp(self.prev_x, self.x, alpha)
+        y = lerp(self.prev_y, self.y, alpha)
+        x_player, y_player = self.player.view_position
+        heading = self.player.view_heading
+
+        dx = x - x_player
+        dy = y - y_player
+        theta = np.arctan2(dy, dx)
+
+        delta = theta - heading
+        # NOTE here 2pi still missing
+        delta[((dx > 0) & (heading > np.pi)) | ((dx < 0) & (dy < 0))] += \
+            np.pi * 2
+
+        viewport = self.game.viewport
+        x_screen = (viewport.half_number_rays + delta / viewport.delta_angle) * \
+            viewport.scaling
+        norm_dist = np.hypot(dx, dy) * np.cos(delta)
+
+        # sprites visible for player
+        visible = np.flatnonzero(
+            self._potentially_visible(
+                self.player.view_tile_position,
+                x.astype(np.intp), y.astype(np.intp)
+            ) &
+            (norm_dist >= PLAYER.size) &
+            (-self.image_half_width < x_screen) &
+            (x_screen < viewport.width + self.image_half_width)
+        )
+        if GRAPHICS.depth_buffer and not GRAPHICS.mode_2d:
+            # skip npc hidden behind walls in all columns before scaling
+            half_widths = viewport.screen_dist / norm_dist[visible] * \
+                self.scale[visible] * self.image_ratio[visible] / 2
+            visible = visible[self.game.ray_caster.visible_spans(
+                x_screen[visible] - half_widths,
+                x_screen[visible] + half_widths,
+                norm_dist[visible]
+            )]
+        for npc in visible.tolist():
+            self.objects_to_render.append(
+                self._project_npc(npc, norm_dist[npc], x_screen[npc])
+            )
 
-    def populate_map(self):
-        for _ in range(DIFFICULTY.num_nps):
-            while True:
-                position = choice(self.game.map.free_tiles)
-                self.game.map.free_tiles.remove(position)
-                manhattan_dist = abs(
-                    position[0]-self.game.player.tile_position[0] +
-                    position[1]-self.game.player.tile_position[1]
-                )
-                if manhattan_dist > DIFFICULTY.min_npc_spawn_dist:
-                    break
-
-            npc_type = choices(
-                self.NPC_TYPES, DIFFICULTY.npc_ratio
-            )[0]
-
-            self.all_npc.append(
-                npc_type(self.game, (position[0] + .5, position[1] + .5))
+    def _project_npc(self, npc, norm_dist, x_screen):
+        image = self._image(npc)
+        if GRAPHICS.mode_2d:
+            return RenderedObject(
+                norm_dist,
+                pg.transform.scale(image, (TILE_SIZE, TILE_SIZE)),
+                (self.x[npc] * TILE_SIZE - TILE_SIZE // 2,
+                 self.y[npc] * TILE_SIZE - TILE_SIZE // 2)
             )
+
+        return SpriteObject.project(
+            self.game.viewport, image, self.image_ratio[npc], norm_dist, x_screen,
+            self.scale[npc], self.height_shift[npc]
+        )
+
+    def _draw_2d(self):
+        LINE_WIDTH = 2
+        COLOR = (255, 87, 51)
+        RADIUS = 15
+
+        for x, y, path in zip(
+                self.x.tolist(), self.y.tolist(), self.paths_to_player):
+            if GRAPHICS.debug_line_of_sight:
+                self.game.mark_dirty(pg.draw.line(
+                    self.game.screen, COLOR,
+                    (x * TILE_SIZE, y * TILE_SIZE),
+                    (self.player.x * TILE_SIZE, self.player.y * TILE_SIZE),
+                    LINE_WIDTH
+                ))
+            self.game.mark_dirty(pg.draw.circle(
+                self.game.screen, COLOR,
+                (int(x * TILE_SIZE), int(y * TILE_SIZE)),
+                RADIUS
+            ))
+
+            [self.game.mark_dirty(pg.draw.rect(
+                self.game.screen,
+                (100, 250, 18),
+                (pos[0] * TILE_SIZE, pos[1] * TILE_SIZE, TILE_SIZE, TILE_SIZE),
+                2
+            )) for pos in path]
@@ -0,0 +1,79 @@
+from collections import Counter
+
+import numpy as np
+
+
+# tile itself and its direct neighbours, i.e. manhattan distance <= 1
+NEIGHBOURHOOD = [(0, 0), (1, 0), (-1, 0), (0, 1), (0, -1)]
+
+
+class OccupancyIndex:
+    """Number of npc per occupied tile.
+
+    Only changed when a npc enters a new tile, spawns or dies, all queries
+    are constant time. `version` is incremented whenever the set of
+    occupied tiles changes. Given the `(height, width)` of the map, the
+    counts are also kept as grid for vectorized queries.
+    """
+
+    def __init__(self, shape=None):
+        self.version = 0
+        self._counts = Counter()
+
+        # same counts as grid with a border of one tile, for array queries
+        self.grid = None
+        if shape is not None:
+            self.grid = np.zeros((shape[0] + 2, shape[1] + 2), dtype=np.int32)
+
+    def add(self, tile):
+        self._counts[tile] += 1
+        if self._counts[tile] == 1:
+            self.version += 1
+        if self.grid is not None:
+            self.grid[tile[1] + 1, tile[0] + 1] += 1
+
+    def remove(self, tile):
+        self._counts[tile] -= 1
+        if self._counts[tile] <= 0:
+            del self._counts[tile]
+            self.version += 1
+        if self.grid is not None:
+            self.grid[tile[1] + 1, tile[0] + 1] -= 1
+
+    def move(self, old_tile, new_tile):
+        self.remove(old_tile)
+        self.add(new_tile)
+
+    def count(self, tile) -> int:
+        return self._counts.get(tile, 0)
+
+    def neighbourhood_occupied(self, tile, exclude=None) -> bool:
+        """Whether any tile within manhattan distance 1 is occupied."""
+        x, y = tile
+        for dx, dy in NEIGHBOURHOOD:
+            neighbour = x + dx, y + dy
+            if neighbour != exclude and neighbour in self._counts:
+                return True
+        return False
+
+    def occupied_mask(self, xs, ys) -> np.ndarray:
+        """Vectorized `in` for arrays of tile coordinates inside the grid."""
+        return self.grid[np.asarray(ys) + 1, np.asarray(xs) + 1] > 0
+
+    def neighbourhood_mask(self, xs, ys, exclude_xs, exclude_ys) -> np.ndarray:
+        """Vectorized `neighbourhood_occupied` for arrays of tiles."""
+        xs, ys = np.asarray(xs), np.asarray(ys)
+        occupied = np.zeros(xs.shape, dtype=bool)
+        for dx, dy in NEIGHBOURHOOD:
+            occupied |= (self.grid[ys + dy + 1, xs + dx + 1] > 0) & \
+                ((xs + dx != exclude_xs) | (ys + dy != exclude_ys))
+        return occupied
+
+    def __contains__(self, tile):
+        return tile in self._counts
+
+    def __iter__(self):
+        return iter(self._counts)
+
+    def __len__(self):
+        return len(self._counts)
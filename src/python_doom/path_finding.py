@@ -1,5 +1,7 @@
 from collections import deque
 
+from python_doom.settings import PathFindingConfig as PATH_FINDING
+
 
 DIRS = [(x, y) for x in [-1, 0, 1] for y in [-1, 0, 1] if not (x == y == 0)]
 # make diagonals last in list
@@ -20,17 +22,69 @@ class PathFinding:
         self.graph = {}
         self._create_graph()
 
+        # next tile towards `flow_target` and number of steps to it
+        # for every tile reachable from `flow_target`
+        self.flow_target = None
+        self.flow_field = {}
+        self.flow_distance = {}
+
+        # paths by start tile, valid for `_cache_key` only
+        self.path_cache = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache_key = None
+
     def _possible_moves(self, x, y):
         return [(x + dx, y + dy) for dx, dy in DIRS
-                if not self.game.map.tiles[y + dy][x + dx]]
+                if self.game.map.is_free(x + dx, y + dy)]
 
     def _create_graph(self):
-        for y, row in enumerate(self.game.map.tiles):
-            for x, tile in enumerate(row):
-                if not tile:
-                    self.graph[(x, y)] = self._possible_moves(x, y)
+        for x, y in self.game.map.free_tiles:
+            self.graph[(x, y)] = self._possible_moves(x, y)
 
     def get_path(self, start, target):
+        """Path from `start` to `target` as list of tiles, `target` first.
+
+        With a flow field, the path is cut after the next tile to walk to.
+        """
+        time_start = self.game.profiler.start()
+        if PATH_FINDING.path_cache:
+            path = self._cached_path(start, target)
+        else:
+            path = self._find_path(start, target)
+        self.game.profiler.stop('pathfinding', time_start)
+        return path
+
+    def _find_path(self, start, target):
+        if PATH_FINDING.flow_field:
+            return self._flow_field_path(start, target)
+        return self._bfs_path(start, target)
+
+    def _cached_path(self, start, target):
+        # every path depends on the target and the npc occupancy,
+        # so all of them are dropped as soon as one of both changes
+        key = target, self.game.npc_handler.occupancy_version
+        if key != self._cache_key:
+            self.path_cache.clear()
+            self._cache_key = key
+
+        path = self.path_cache.get(start)
+        if path is not None:
+            self.cache_hits += 1
+            return path
+
+        # NOTE: also no path found is cached as path `[start]`
+        self.cache_misses += 1
+        path = self._find_path(start, target)
+        self.path_cache[start] = path
+        return path
+
+    @property
+    def cache_hit_rate(self) -> float:
+        requests = self.cache_hits + self.cache_misses
+        return self.cache_hits / requests if requests else 0.0
+
+    def _bfs_path(self, start, target):
         visited = self._bfs(start, target)
         path = [target]
 
@@ -38,7 +92,6 @@ class PathFinding:
             try:
                 path.append(visited[path[-1]])
             except KeyError:
-                print('no path found, todo :D')
                 path = [start]
 
         return path
@@ -61,3 +114,45 @@ class PathFinding:
                 queue.append(move)
                 visited[move] = node
         return visited
+
+    def _flow_field_path(self, start, target):
+        if target != self.flow_target:
+            self._update_flow_field(target)
+
+        if start == target or start not in self.flow_field:
+            return [start]
+
+        next_tile = self.flow_field[start]
+        if next_tile != target and \
+           next_tile in self.game.npc_handler.npc_positions:
+            next_tile = self._avoid_occupied(start)
+        return [next_tile, start]
+
+    def _update_flow_field(self, target):
+        """Breadth first search over the whole map outwards from `target`."""
+        queue = deque([target])
+        self.flow_target = target
+        self.flow_field = {target: target}
+        self.flow_distance = {target: 0}
+
+        while queue:
+            node = queue.popleft()
+            distance = self.flow_distance[node] + 1
+            for move in self.graph.get(node, []):
+                if move in self.flow_field:
+                    continue
+                queue.append(move)
+                self.flow_field[move] = node
+                self.flow_distance[move] = distance
+
+    def _avoid_occupied(self, start):
+        """Free neighbour closer to the flow target, else `start` itself."""
+        distance = self.flow_distance[start]
+        best = start
+        for move in self.graph[start]:
+            if move in self.game.npc_handler.npc_positions:
+                continue
+            if self.flow_distance.get(move, distance) < distance:
+                best = move
+                distance = self.flow_distance[move]
+        return best
@@ -4,20 +4,24 @@ import pygame as pg
 import numpy as np
 
 from python_doom.settings import PlayerConfig as PLAYER
-from python_doom.settings import ScreenConfig as SCREEN
 from python_doom.settings import GraphicsConfig as GRAPHICS
 from python_doom.settings import ControlsConfig as CONTROLS
+from python_doom.clock import lerp, lerp_angle
 from python_doom.maps import TILE_SIZE
 
 
 class Player:
     shot_fired = False
     health = 100
+    rel_move = 0
 
     def __init__(self, game):
         self.game = game
         self.x, self.y = PLAYER.position
         self.heading = PLAYER.heading
+        # pose before the last simulation tick
+        self.prev_x, self.prev_y = self.x, self.y
+        self.prev_heading = self.heading
 
     def check_shooting(self, event):
         if event.type == pg.MOUSEBUTTONDOWN:
@@ -27,14 +31,13 @@ class Player:
                 self.game.sounds.shotgun.play()
                 self.shot_fired = True
 
-    def _movement(self):
+    def _movement(self, keys):
         v = PLAYER.movement_speed * self.game.dt
         v_sin = math.sin(self.heading) * v
         v_cos = math.cos(self.heading) * v
 
         dx, dy = 0, 0
 
-        keys = pg.key.get_pressed()
         # Moving
         if keys[pg.K_w]:
             dx += v_cos
@@ -58,17 +61,9 @@ class Player:
         self._check_collisions(dx, dy)
         self.heading %= math.tau
 
-    def _mouse_look(self):
-        x, y = pg.mouse.get_pos()
-        if not (
-            CONTROLS.mouse_border_left <= x <= CONTROLS.mouse_border_right and
-            CONTROLS.mouse_border_bottom <= y <= CONTROLS.mouse_border_top
-        ):
-            pg.mouse.set_pos([SCREEN.half_width, SCREEN.half_height])
-
-        self.rel_move = pg.mouse.get_rel()[0]
+    def _mouse_look(self, mouse_rel):
         self.rel_move = np.clip(
-            self.rel_move, -CONTROLS.mouse_max_rel_move,
+            mouse_rel, -CONTROLS.mouse_max_rel_move,
             CONTROLS.mouse_max_rel_move
         )
 
@@ -78,7 +73,7 @@ class Player:
         for xs, ys in [(1, 1), (1, -1), (-1, -1), (-1, 1)]:
             dx = xs * PLAYER.size
             dy = ys * PLAYER.size
-            if (int(x+dx), int(y+dy)) in self.game.map.obstructed_tiles:
+            if not self.game.map.is_free(int(x+dx), int(y+dy)):
                 return False
         return True
 
@@ -94,21 +89,27 @@ class Player:
         RADIUS = 15
 
         if GRAPHICS.mode_2d:
-            pg.draw.line(
+            self.game.mark_dirty(pg.draw.line(
                 self.game.screen, COLOR,
                 (self.x * TILE_SIZE, self.y * TILE_SIZE),
                 (self.x * TILE_SIZE + GRAPHICS.max_depth * TILE_SIZE * math.cos(self.heading),
                  self.y * TILE_SIZE + GRAPHICS.max_depth * TILE_SIZE * math.sin(self.heading)),
-                LINE_WIDTH)
-            pg.draw.circle(
+                LINE_WIDTH))
+            self.game.mark_dirty(pg.draw.circle(
                 self.game.screen, COLOR,
                 (int(self.x * TILE_SIZE), int(self.y * TILE_SIZE)),
                 RADIUS
-            )
+            ))
+
+    def tick(self):
+        self.prev_x, self.prev_y = self.x, self.y
+        self.prev_heading = self.heading
+
+        keys, mouse_rel = self.game.controls.read()
+        self._movement(keys)
+        self._mouse_look(mouse_rel)
 
     def update(self):
-        self._movement()
-        self._mouse_look()
         self._draw_2d()
 
     def take_damage(self, attack_damage):
@@ -123,3 +124,20 @@ class Player:
     @property
     def tile_position(self):
         return int(self.x), int(self.y)
+
+    @property
+    def view_position(self):
+        """Position to render, interpolated between the last two ticks."""
+        alpha = self.game.sim_clock.alpha
+        return lerp(self.prev_x, self.x, alpha), lerp(self.prev_y, self.y, alpha)
+
+    @property
+    def view_tile_position(self):
+        x, y = self.view_position
+        return int(x), int(y)
+
+    @property
+    def view_heading(self):
+        return lerp_angle(
+            self.prev_heading, self.heading, self.game.sim_clock.alpha
+        )
@@ -0,0 +1,173 @@
+import csv
+import json
+import time
+
+import numpy as np
+import pygame as pg
+
+from python_doom.settings import ScreenConfig as SCREEN
+from python_doom.settings import ProfilerConfig as PROFILER
+
+
+class FrameProfiler:
+    """Ring buffer of the time spent per stage of every frame.
+
+    Stages are measured with `start` and `stop`, which do nothing but
+    return while the profiler is disabled. Metrics are values sampled
+    once per frame with `record`, kept until recorded again.
+    """
+    STAGES = [
+        'player', 'ray_casting', 'column_building', 'sprites', 'npc_logic',
+        'pathfinding', 'weapon', 'sorting', 'blitting', 'display', 'capture'
+    ]
+    # time of nested stages is subtracted from their parent stage
+    NESTED = {'column_building': 'ray_casting', 'pathfinding': 'npc_logic'}
+    METRICS = ['resolution_scale']
+
+    COLORS = [
+        (14, 185, 162), (40, 250, 10), (120, 200, 60), (200, 200, 0),
+        (255, 87, 51), (255, 160, 120), (160, 160, 160), (90, 90, 255),
+        (180, 90, 255), (255, 255, 255), (255, 60, 160)
+    ]
+
+    def __init__(self, capacity=PROFILER.capacity, enabled=PROFILER.enabled):
+        self.enabled = enabled
+        self.overlay = PROFILER.overlay
+        self.capacity = capacity
+
+        self.buffer = np.zeros((capacity, len(self.STAGES)))
+        self.metrics = np.zeros((capacity, len(self.METRICS)))
+        self.frames = 0
+
+        self._index = {stage: idx for idx, stage in enumerate(self.STAGES)}
+        self._nested = [
+            (self._index[child], self._index[parent])
+            for child, parent in self.NESTED.items()
+        ]
+        self._frame = np.zeros(len(self.STAGES))
+        self._metric_index = {
+            metric: idx for idx, metric in enumerate(self.METRICS)
+        }
+        self._metrics = np.zeros(len(self.METRICS))
+        self._font = None
+
+        self.toggle_key = pg.key.key_code(PROFILER.toggle_key)
+        self.dump_key = pg.key.key_code(PROFILER.dump_key)
+
+    def start(self) -> float:
+        return time.perf_counter() if self.enabled else 0.0
+
+    def stop(self, stage: str, start: float):
+        if self.enabled:
+            self._frame[self._index[stage]] += time.perf_counter() - start
+
+    def record(self, metric: str, value: float):
+        if self.enabled:
+            self._metrics[self._metric_index[metric]] = value
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+
+        for child, parent in self._nested:
+            self._frame[parent] -= self._frame[child]
+
+        self.buffer[self.frames % self.capacity] = self._frame
+        self.metrics[self.frames % self.capacity] = self._metrics
+        self.frames += 1
+        self._frame[:] = 0
+
+    def last(self, n: int) -> np.ndarray:
+        """Time per stage in ms of the last `n` frames, oldest first."""
+        return self.buffer[self._last_indices(n)] * 1e3
+
+    def last_metrics(self, n: int) -> np.ndarray:
+        """Metrics of the last `n` frames, oldest first."""
+        return self.metrics[self._last_indices(n)]
+
+    def _last_indices(self, n: int) -> np.ndarray:
+        n = min(n, self.frames, self.capacity)
+        return np.arange(self.frames - n, self.frames) % self.capacity
+
+    def check_events(self, event):
+        if event.type != pg.KEYDOWN:
+            return
+        if event.key == self.toggle_key:
+            self.overlay = not self.overlay
+            self.enabled = self.overlay
+        if event.key == self.dump_key and self.frames:
+            self.dump(
+                time.strftime(f'profile_%Y%m%d_%H%M%S.{PROFILER.dump_format}')
+            )
+
+    def dump(self, path: str, n=PROFILER.dump_frames):
+        """Write the last `n` frames as CSV or JSON, chosen by suffix."""
+        frames = self.last(n)
+        metrics = self.last_metrics(n)
+
+        if path.endswith('.json'):
+            with open(path, 'w') as f:
+                json.dump({
+                    'unit': 'ms',
+                    'stages': self.STAGES,
+                    'frames': frames.tolist(),
+                    'metrics': dict(zip(self.METRICS, metrics.T.tolist()))
+                }, f)
+            return
+
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame'] + self.STAGES + ['total'] + self.METRICS)
+            first = self.frames - len(frames)
+            for idx, (row, values) in enumerate(
+                    zip(frames.tolist(), metrics.tolist())):
+                writer.writerow([first + idx] + row + [sum(row)] + values)
+
+    def draw(self, screen):
+        """Draw the last frames as stacked bars into the lower left."""
+        frames = self.last(PROFILER.overlay_frames)
+        if not len(frames):
+            return
+        if self._font is None:
+            self._font = pg.font.Font(None, 20)
+
+        bar_width = 2
+        scale = PROFILER.overlay_ms_height
+        height = int(scale * 1e3 / 30)  # up to 30 fps
+        width = bar_width * PROFILER.overlay_frames
+        top = SCREEN.height - height
+
+        background = pg.Surface((width, height), pg.SRCALPHA)
+        background.fill((0, 0, 0, 160))
+        screen.blit(background, (0, top))
+
+        bottoms = np.cumsum(frames, axis=1) * scale
+        tops = bottoms - frames * scale
+        for x, (frame_tops, frame_bottoms) in enumerate(
+                zip(tops.tolist(), bottoms.tolist())):
+            for color, y0, y1 in zip(self.COLORS, frame_tops, frame_bottoms):
+                if y1 - y0 >= 1:
+                    pg.draw.rect(screen, color, (
+                        x * bar_width, SCREEN.height - min(y1, height),
+                        bar_width, max(0, min(y1, height) - y0)
+                    ))
+
+        # frame budget of 60 fps
+        y_budget = SCREEN.height - scale * 1e3 / 60
+        pg.draw.line(screen, (255, 0, 0), (0, y_budget), (width, y_budget))
+
+        means = frames.mean(axis=0)
+        lines = [f'{frames.sum(axis=1).mean():.1f} ms total'] + [
+            f'{stage} {mean:.2f} ms'
+            for stage, mean in zip(self.STAGES, means.tolist())
+        ] + [
+            f'{metric} {value:.2f}'
+            for metric, value in zip(self.METRICS, self._metrics.tolist())
+        ]
+        colors = [(255, 255, 255)] + self.COLORS + \
+            [(255, 255, 255)] * len(self.METRICS)
+        for idx, (line, color) in enumerate(zip(lines, colors)):
+            screen.blit(
+                self._font.render(line, True, color),
+                (width + 10, top + idx * 16)
+            )
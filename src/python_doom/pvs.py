@@ -0,0 +1,143 @@
+import hashlib
+import math
+import os
+
+import numpy as np
+
+from python_doom.settings import GraphicsConfig as GRAPHICS
+
+
+# bump to invalidate cached tables after changes of the computation
+PVS_VERSION = 2
+
+
+class PotentiallyVisibleSet:
+    """Table of which free tiles can possibly see which other free tiles.
+
+    Two tiles see each other if a line through both does not enter a wall
+    in between. Such a line can always be moved until it passes through
+    two tile corners, so only lines through two corners are tested, which
+    finds every pair with line of sight. Tiles next to a visible tile
+    count as visible too, since sprites reach beyond their tile. Rows are
+    stored as bitset over `Maps.free_tiles`, cached on disk by hash of
+    the map.
+    """
+
+    def __init__(self, map, cache_dir=GRAPHICS.pvs_cache_dir):
+        self.map = map
+        self.num_tiles = len(map.free_tiles)
+
+        path = os.path.join(cache_dir, f'pvs_{self.map_hash(map)}.npz')
+        if os.path.isfile(path):
+            self.bits = np.load(path)['bits']
+        else:
+            self.bits = np.packbits(self._compute(), axis=1)
+            os.makedirs(cache_dir, exist_ok=True)
+            np.savez_compressed(path, bits=self.bits)
+
+        self._row_tile = None
+        self._row = None
+
+    @staticmethod
+    def map_hash(map) -> str:
+        digest = hashlib.sha1(f'{PVS_VERSION}{map.grid.shape}'.encode())
+        digest.update(map.grid.tobytes())
+        return digest.hexdigest()[:16]
+
+    def _compute(self) -> np.ndarray:
+        table = np.eye(self.num_tiles, dtype=bool)
+        height, width = self.map.grid.shape
+        for dx in range(-width, width + 1):
+            for dy in range(height + 1):
+                # every direction between two corners once
+                if math.gcd(dx, dy) == 1 and (dy > 0 or dx == 1):
+                    table |= self._visible_along(dx, dy)
+
+        # add neighbours of all visible tiles
+        neighbours = np.zeros_like(table)
+        index = self.map.free_tile_index
+        for (x, y), idx in zip(self.map.free_tiles, range(self.num_tiles)):
+            around = index[max(y - 1, 0):y + 2, max(x - 1, 0):x + 2]
+            neighbours[idx, around[around >= 0]] = True
+        return (table.astype(np.uint8) @ neighbours.astype(np.uint8)) > 0
+
+    def _visible_along(self, dx, dy) -> np.ndarray:
+        """Pairs of tiles seeing each other along lines of direction `(dx, dy)`.
+
+        Lines `dy * x - dx * y = c` of integer `c` pass through all corners.
+        A line touching a tile makes it visible, walls only block lines
+        through their inside, to err on the side of visibility.
+        """
+        ys, xs = np.indices(self.map.grid.shape).reshape(2, -1)
+        wall = self.map.grid.ravel() > 0
+
+        # range of `c` over the corners of every tile
+        corner = dy * xs - dx * ys
+        c_min = corner + min(0, dy) + min(0, -dx)
+        c_max = corner + max(0, dy) + max(0, -dx)
+        c = np.arange(c_min.min(), c_max.max() + 1)[:, None]
+        touched = (c_min <= c) & (c <= c_max)
+        # only lines touching two free tiles add pairs
+        lines = np.count_nonzero(touched & ~wall, axis=1) > 1
+        c, touched = c[lines], touched[lines]
+        crossed = (c_min < c) & (c < c_max) & wall
+
+        # tiles ordered along every line by the center of their chord,
+        # a tile belongs to the run between the walls crossed around it
+        length = dx * dx + dy * dy
+        start = np.full(touched.shape, -np.inf)
+        end = np.full(touched.shape, np.inf)
+        if dx:
+            bounds = (xs * length - c * dy) / dx, ((xs + 1) * length - c * dy) / dx
+            start = np.maximum(start, np.minimum(*bounds))
+            end = np.minimum(end, np.maximum(*bounds))
+        if dy:
+            bounds = (ys * length + c * dx) / dy, ((ys + 1) * length + c * dx) / dy
+            start = np.maximum(start, np.minimum(*bounds))
+            end = np.minimum(end, np.maximum(*bounds))
+        order = np.argsort(np.where(touched, (start + end) / 2, np.inf), axis=1)
+        runs = np.empty(touched.shape, dtype=np.intp)
+        np.put_along_axis(
+            runs, order,
+            np.cumsum(np.take_along_axis(crossed, order, axis=1), axis=1),
+            axis=1
+        )
+
+        # one row per run of tiles of a line, tiles of a run see each other
+        line, tile = np.nonzero(touched & ~wall)
+        run, members = np.unique(
+            line * (len(xs) + 1) + runs[line, tile], return_inverse=True
+        )
+        in_run = np.zeros((len(run), self.num_tiles), dtype=np.float32)
+        in_run[members.ravel(), self.map.free_tile_index.ravel()[tile]] = 1
+        return (in_run.T @ in_run) > 0
+
+    def visible_from(self, tile) -> np.ndarray:
+        """Boolean array over `Maps.free_tiles` of tiles `tile` may see."""
+        if tile != self._row_tile:
+            x, y = tile
+            inside = 0 <= x < self.map.width and 0 <= y < self.map.height
+            idx = self.map.free_tile_index[y, x] if inside else -1
+            if idx < 0:
+                self._row = np.ones(self.num_tiles, dtype=bool)
+            else:
+                self._row = np.unpackbits(
+                    self.bits[idx], count=self.num_tiles
+                ).astype(bool)
+            self._row_tile = tile
+        return self._row
+
+    def visible_mask(self, tile, xs, ys) -> np.ndarray:
+        """Whether tiles `(xs, ys)` may be visible from `tile`.
+
+        Tiles which are not free are always considered visible.
+        """
+        xs = np.asarray(xs, dtype=np.intp)
+        ys = np.asarray(ys, dtype=np.intp)
+        index = np.full(xs.shape, -1, dtype=np.intp)
+        inside = (xs >= 0) & (xs < self.map.width) & \
+            (ys >= 0) & (ys < self.map.height)
+        index[inside] = self.map.free_tile_index[ys[inside], xs[inside]]
+
+        row = self.visible_from(tile)
+        return np.where(index >= 0, row[np.maximum(index, 0)], True)
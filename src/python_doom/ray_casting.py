@@ -1,9 +1,11 @@
 import math
+import numpy as np
 import pygame as pg
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 
+from python_doom.cache import SurfaceCache
 from python_doom.maps import TILE_SIZE
-from python_doom.settings import ScreenConfig as SCREEN
 from python_doom.settings import GraphicsConfig as GRAPHICS
 
 from python_doom.rendering import RenderedObject
@@ -17,44 +19,221 @@ class Ray:
     projection_height: float
 
 
+def _first_hit(grid, xs, ys):
+    """Return texture id and step index of first obstructed tile per row.
+
+    Positions outside of the grid count as free tiles. Rows without any
+    hit get texture id 1 and step index `max_depth`, like `cast_ray`.
+    """
+    rows, cols = grid.shape
+    max_depth = xs.shape[1] - 1
+
+    xs, ys = xs[:, :max_depth], ys[:, :max_depth]
+    valid = np.isfinite(xs) & np.isfinite(ys)
+    # NOTE: casting truncates towards zero, just as `int()` does
+    # NOTE: `np.clip` is slower than both bounds on small batches
+    x_tiles = np.minimum(np.maximum(np.where(valid, xs, -1), -1), cols)
+    y_tiles = np.minimum(np.maximum(np.where(valid, ys, -1), -1), rows)
+    x_tiles, y_tiles = x_tiles.astype(np.intp), y_tiles.astype(np.intp)
+    valid &= (x_tiles >= 0) & (x_tiles < cols) & \
+        (y_tiles >= 0) & (y_tiles < rows)
+
+    textures = np.where(
+        valid,
+        grid[np.maximum(np.minimum(y_tiles, rows - 1), 0),
+             np.maximum(np.minimum(x_tiles, cols - 1), 0)],
+        0
+    )
+    hits = textures > 0
+    any_hit = hits.any(axis=1)
+
+    steps = np.where(any_hit, hits.argmax(axis=1), max_depth)
+    texture_ids = np.where(
+        any_hit, textures[np.arange(len(textures)), steps % max_depth], 1
+    )
+    return texture_ids, steps
+
+
+def cast_rays(grid, x, y, angles, max_depth=GRAPHICS.max_depth):
+    """Cast a batch of rays against a grid of texture ids (0 = free).
+
+    Vectorized version of `RayCasting.cast_ray`, stepping through all
+    horizontal and vertical tile borders of all rays at once. `x` and `y`
+    are either scalars or arrays matching `angles`.
+
+    Returns arrays of depth, texture id and texture offset per ray.
+    """
+    angles = np.asarray(angles, dtype=float)
+    x = np.broadcast_to(np.asarray(x, dtype=float), angles.shape)
+    y = np.broadcast_to(np.asarray(y, dtype=float), angles.shape)
+    x_tile, y_tile = np.trunc(x), np.trunc(y)
+
+    a_sin, a_cos = np.sin(angles), np.cos(angles)
+    steps = np.arange(max_depth + 1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Check horizontally
+        y_hor = np.where(a_sin > 0, y_tile + 1, y_tile - 1e-6)
+        dy = np.where(a_sin > 0, 1., -1.)
+
+        depth_hor = (y_hor - y) / a_sin
+        x_hor = x + depth_hor * a_cos
+
+        delta_depth = dy / a_sin
+        dx = delta_depth * a_cos
+
+        texture_hor_id, n = _first_hit(
+            grid,
+            x_hor[:, None] + dx[:, None] * steps,
+            y_hor[:, None] + dy[:, None] * steps
+        )
+        x_hor = x_hor + dx * n
+        depth_hor = depth_hor + delta_depth * n
+
+        # Check vertically
+        x_vert = np.where(a_cos > 0, x_tile + 1, x_tile - 1e-6)
+        dx = np.where(a_cos > 0, 1., -1.)
+
+        depth_vert = (x_vert - x) / a_cos
+        y_vert = y + depth_vert * a_sin
+
+        delta_depth = dx / a_cos
+        dy = delta_depth * a_sin
+
+        texture_vert_id, n = _first_hit(
+            grid,
+            x_vert[:, None] + dx[:, None] * steps,
+            y_vert[:, None] + dy[:, None] * steps
+        )
+        y_vert = y_vert + dy * n
+        depth_vert = depth_vert + delta_depth * n
+
+    # Rays parallel to an axis never intercept its borders
+    depth_hor[~np.isfinite(depth_hor)] = np.inf
+    depth_vert[~np.isfinite(depth_vert)] = np.inf
+
+    # Determine texture offset of closest depth
+    vertical = depth_vert < depth_hor
+    depth = np.where(vertical, depth_vert, depth_hor)
+    texture_id = np.where(vertical, texture_vert_id, texture_hor_id)
+
+    with np.errstate(invalid='ignore'):
+        y_vert %= 1
+        x_hor %= 1
+    texture_offset = np.where(
+        vertical,
+        np.where(a_cos > 0, y_vert, 1 - y_vert),
+        np.where(a_sin > 0, 1 - x_hor, x_hor)
+    )
+    texture_offset[~np.isfinite(texture_offset)] = 0
+
+    return depth, texture_id, texture_offset
+
+
+def line_of_sight(grid, sources, targets):
+    """Visibility and distance between pairs of points.
+
+    `sources` and `targets` are arrays of `(x, y)` points of shape
+    `(N, 2)`, a single point is broadcast to all pairs. A target is
+    visible if its distance is shorter than the first wall hit by the
+    ray from its source towards it. Independent of the player pose.
+
+    Returns boolean array of visibility and array of distances.
+    """
+    sources, targets = np.broadcast_arrays(
+        np.asarray(sources, dtype=float).reshape(-1, 2),
+        np.asarray(targets, dtype=float).reshape(-1, 2)
+    )
+    dx, dy = (targets - sources).T
+    distance = np.hypot(dx, dy)
+
+    dist_wall, _, _ = cast_rays(
+        grid, sources[:, 0], sources[:, 1], np.arctan2(dy, dx)
+    )
+    return distance < dist_wall, distance
+
+
 class RayCasting:
     def __init__(self, game):
         self.game = game
+        self.viewport = game.viewport
 
         self.objects_to_render = []
+        self.casted_rays = []
+        # depth buffer, depth of the closest wall per ray of the last scan
+        self.depths = self.texture_ids = np.empty(0)
+        self.texture_offsets = self.projection_heights = np.empty(0)
         self.textures = self.game.renderer.wall_textures
+        self.column_cache = SurfaceCache(GRAPHICS.column_cache_max_bytes)
+        self.pool = None
+        self.set_workers(GRAPHICS.ray_casting_workers)
+        self._update_player_pose()
+
+    def set_workers(self, workers: int):
+        """Process the view in `workers` bands of columns on a thread pool.
+
+        NumPy releases the GIL within its kernels, so bands are processed
+        in parallel. A single worker processes all rays on the caller.
+        """
+        if self.pool is not None:
+            self.pool.shutdown()
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(workers) if workers > 1 else None
+
+    def map_bands(self, function, number_rays) -> list:
+        """Results of `function(band)` per slice of rays, in order of rays."""
+        if self.pool is None:
+            return [function(slice(0, number_rays))]
+
+        bounds = np.linspace(0, number_rays, self.workers + 1).astype(int)
+        bands = [
+            slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])
+            if stop > start
+        ]
+        return list(self.pool.map(function, bands))
 
     def update(self):
         self._scan_field_of_view()
+        if GRAPHICS.wall_renderer == 'pixel_buffer':
+            # walls are drawn by `Renderer` straight into the screen
+            self.objects_to_render = []
+            return
+
+        start = self.game.profiler.start()
         self._get_objects_to_render()
+        self.game.profiler.stop('column_building', start)
 
     def _get_objects_to_render(self):
         self.objects_to_render = []
+        view_height = self.viewport.height
         for ray_id, ray in enumerate(self.casted_rays):
+            texture_x = int(ray.texture_offset * (
+                GRAPHICS.texture_size - GRAPHICS.scaling
+            ))
+
+            if GRAPHICS.column_cache:
+                projection_height = max(
+                    GRAPHICS.column_height_step,
+                    int(ray.projection_height) //
+                    GRAPHICS.column_height_step * GRAPHICS.column_height_step
+                )
+                wall_column = self.column_cache.get(
+                    (ray.texture_id, texture_x, projection_height,
+                     view_height),
+                    lambda: self._scale_wall_column(
+                        ray.texture_id, texture_x, projection_height
+                    )
+                )
+            else:
+                projection_height = ray.projection_height
+                wall_column = self._scale_wall_column(
+                    ray.texture_id, texture_x, projection_height
+                )
 
-            # TODO Better naming!
-            y = SCREEN.half_height - ray.projection_height // 2
-            h = GRAPHICS.texture_size
-            b = 0
-            hh = int(ray.projection_height)
-
+            y = self.viewport.half_height - projection_height // 2
             # Limit object in height when getting close
-            if ray.projection_height >= SCREEN.height:
+            if projection_height >= view_height:
                 y = 0
-                h = GRAPHICS.texture_size * SCREEN.height / ray.projection_height
-                b = GRAPHICS.half_texture_size - h // 2
-                hh = SCREEN.height
-
-            wall_column = self.textures[ray.texture_id].subsurface(
-                ray.texture_offset * (
-                    GRAPHICS.texture_size - GRAPHICS.scaling
-                ),
-                b, GRAPHICS.scaling, h
-            )
-
-            wall_column = pg.transform.scale(
-                wall_column, (GRAPHICS.scaling, hh)
-            )
 
             wall_position = (ray_id * GRAPHICS.scaling, y)
 
@@ -64,42 +243,146 @@ class RayCasting:
                 )
             )
 
+    def _scale_wall_column(self, texture_id, texture_x, projection_height):
+        # TODO Better naming!
+        h = GRAPHICS.texture_size
+        b = 0
+        hh = int(projection_height)
+
+        # Limit object in height when getting close
+        view_height = self.viewport.height
+        if projection_height >= view_height:
+            h = GRAPHICS.texture_size * view_height / projection_height
+            b = GRAPHICS.half_texture_size - h // 2
+            hh = view_height
+
+        wall_column = self.textures[texture_id].subsurface(
+            texture_x, b, GRAPHICS.scaling, h
+        )
+
+        return pg.transform.scale(
+            wall_column, (GRAPHICS.scaling, hh)
+        )
+
     def _scan_field_of_view(self):
         self.casted_rays = []
+        self._update_player_pose()
+
+        if GRAPHICS.batch_ray_casting:
+            self._scan_field_of_view_batched()
+        else:
+            self._scan_field_of_view_per_ray()
+
+    def _update_player_pose(self):
+        player = self.game.player
+        self.x_player, self.y_player = player.view_position
+        self.x_tile, self.y_tile = player.view_tile_position
+        self.heading = player.view_heading
+
+    def _scan_field_of_view_batched(self):
+        angles = self.heading + self.viewport.ray_angles
+        depths, texture_ids, offsets = (
+            np.concatenate(results) for results in zip(*self.map_bands(
+                lambda band: cast_rays(
+                    self.game.map.grid, self.x_player, self.y_player,
+                    angles[band]
+                ),
+                len(angles)
+            ))
+        )
+
+        if GRAPHICS.mode_2d and GRAPHICS.debug_rays:
+            for depth, angle in zip(depths, angles):
+                self.game.mark_dirty(self._draw_ray(
+                    self.game.screen, self.x_player, self.y_player,
+                    depth, math.sin(angle), math.cos(angle)
+                ))
+
+        if GRAPHICS.mode_2d:
+            return
+
+        depths *= self.viewport.fishbowl_correction  # remove fishbowl effects
+        proj_heights = self.viewport.screen_dist / (depths + 1e-4)
 
-        self.x_player, self.y_player = self.game.player.position
-        self.x_tile, self.y_tile = self.game.player.tile_position
+        self.depths, self.texture_ids = depths, texture_ids
+        self.texture_offsets, self.projection_heights = offsets, proj_heights
 
-        ray_angle = self.game.player.heading - GRAPHICS.half_fov
-        for ray_id in range(GRAPHICS.number_rays):
+        if not GRAPHICS.debug_render_textures:
+            for ray_id, (depth, proj_height) in enumerate(
+                    zip(depths, proj_heights)):
+                self._draw_object_frame(ray_id, depth, proj_height)
+            return
+
+        self.casted_rays = [
+            Ray(*ray) for ray in zip(
+                depths.tolist(), texture_ids.tolist(),
+                offsets.tolist(), proj_heights.tolist()
+            )
+        ]
+
+    def _scan_field_of_view_per_ray(self):
+        """Reference implementation casting one ray after another."""
+        ray_angle = self.heading - GRAPHICS.half_fov
+        for ray_id in range(self.viewport.number_rays):
             a_sin = math.sin(ray_angle)
             a_cos = math.cos(ray_angle)
 
             depth, texture_id, offset = self.cast_ray(a_sin, a_cos)
 
             if GRAPHICS.mode_2d and GRAPHICS.debug_rays:
-                self._draw_ray(
+                self.game.mark_dirty(self._draw_ray(
                     self.game.screen, self.x_player, self.y_player,
                     depth, a_sin, a_cos
-                )
+                ))
 
             if not GRAPHICS.mode_2d:
                 depth *= math.cos(
-                    self.game.player.heading - ray_angle
+                    self.heading - ray_angle
                 )  # remove fishbowl effects
-                proj_height = GRAPHICS.screen_dist / (depth + 1e-4)
+                proj_height = self.viewport.screen_dist / (depth + 1e-4)
 
                 if not GRAPHICS.debug_render_textures:
-                    self._draw_object_frame(
-                        self.game.screen, ray_id, depth, proj_height
-                    )
+                    self._draw_object_frame(ray_id, depth, proj_height)
 
                 if GRAPHICS.debug_render_textures:
                     self.casted_rays.append(Ray(
                         depth, texture_id, offset, proj_height
                     ))
 
-            ray_angle += GRAPHICS.delta_angle
+            ray_angle += self.viewport.delta_angle
+
+        if self.casted_rays:
+            self.depths, self.texture_ids, self.texture_offsets, \
+                self.projection_heights = map(np.array, zip(*[
+                    (ray.depth, ray.texture_id, ray.texture_offset,
+                     ray.projection_height) for ray in self.casted_rays
+                ]))
+
+    def visible_spans(self, lefts, rights, depths) -> np.ndarray:
+        """Whether objects are in front of a wall in any of their columns.
+
+        Objects span from x `lefts` to `rights` of the view at `depths`,
+        all given as scalars or arrays. Without depth buffer all objects
+        are visible.
+        """
+        lefts, rights, depths = np.broadcast_arrays(
+            np.atleast_1d(lefts), np.atleast_1d(rights), np.atleast_1d(depths)
+        )
+        number_rays = len(self.depths)
+        if not number_rays:
+            return np.ones(lefts.shape, dtype=bool)
+
+        scaling = self.viewport.scaling
+        first = np.clip(np.floor(lefts / scaling), 0, number_rays)
+        last = np.clip(np.ceil(rights / scaling), 0, number_rays)
+
+        # indexed by [object, ray]
+        rays = np.arange(number_rays)
+        in_span = (rays >= first[:, None]) & (rays < last[:, None])
+        return (in_span & (self.depths > depths[:, None])).any(axis=1)
+
+    def line_of_sight(self, sources, targets):
+        return line_of_sight(self.game.map.grid, sources, targets)
 
     def cast_ray(self, a_sin: float, a_cos: float):
         """Cast a ray and determine information of intercepted object.
@@ -121,9 +404,9 @@ class RayCasting:
         dx = delta_depth * a_cos
 
         for _ in range(GRAPHICS.max_depth):
-            tile = (int(x_hor), int(y_hor))
-            if tile in self.game.map.obstructed_tiles:
-                texture_hor_id = self.game.map.obstructed_tiles[tile]
+            texture_id = self.game.map.texture_id(int(x_hor), int(y_hor))
+            if texture_id:
+                texture_hor_id = texture_id
                 break
             x_hor += dx
             y_hor += dy
@@ -139,9 +422,9 @@ class RayCasting:
         dy = delta_depth * a_sin
 
         for _ in range(GRAPHICS.max_depth):
-            tile = (int(x_vert), int(y_vert))
-            if tile in self.game.map.obstructed_tiles:
-                texture_vert_id = self.game.map.obstructed_tiles[tile]
+            texture_id = self.game.map.texture_id(int(x_vert), int(y_vert))
+            if texture_id:
+                texture_vert_id = texture_id
                 break
             x_vert += dx
             y_vert += dy
@@ -164,7 +447,7 @@ class RayCasting:
         LINE_WIDTH = 2
         COLOR = (40, 250, 10)
 
-        pg.draw.line(
+        return pg.draw.line(
             screen, COLOR,
             (x * TILE_SIZE, y * TILE_SIZE),
             (x * TILE_SIZE + TILE_SIZE * depth * a_cos,
@@ -172,13 +455,13 @@ class RayCasting:
             LINE_WIDTH
         )
 
-    @staticmethod
-    def _draw_object_frame(screen, ray_id, depth, proj_height):
+    def _draw_object_frame(self, ray_id, depth, proj_height):
         LINE_WIDTH = 2
         color = (255 / (1 + depth ** 5 * 1e-5 * 2), 0, 0)
 
         rect = pg.Rect(
-            ray_id * GRAPHICS.scaling, SCREEN.half_height - proj_height // 2,
-            GRAPHICS.scaling, proj_height
+            ray_id * self.viewport.scaling,
+            self.viewport.half_height - proj_height // 2,
+            self.viewport.scaling, proj_height
         )
-        pg.draw.rect(screen, color, rect, LINE_WIDTH)
+        pg.draw.rect(self.viewport.surface, color, rect, LINE_WIDTH)
@@ -1,3 +1,6 @@
+import functools
+
+import numpy as np
 import pygame as pg
 from dataclasses import dataclass
 
@@ -13,9 +16,40 @@ class RenderedObject:
     position: tuple
 
 
+class DirtyRects:
+    """Parts of the window drawn in 2D mode, to update only those.
+
+    Everything drawn into the window is marked with `add`. `clear`
+    restores the background behind all rects drawn since the last clear,
+    `update` sends all rects changed since the last update to the display.
+    """
+
+    def __init__(self, screen, background):
+        self.screen = screen
+        self.background = background
+        self._drawn = []
+        # the first update shows the whole background
+        self.screen.blit(background, (0, 0))
+        self._changed = [screen.get_rect()]
+
+    def add(self, rect):
+        rect = self.screen.get_rect().clip(rect)
+        self._drawn.append(rect)
+        self._changed.append(rect)
+
+    def clear(self):
+        for rect in self._drawn:
+            self.screen.blit(self.background, rect, rect)
+        self._changed += self._drawn
+        self._drawn = []
+
+    def update(self):
+        pg.display.update(self._changed)
+        self._changed = []
+
+
 class Renderer:
     sky_offset = 0
-    player_rel_move_factor = 4.5
 
     rendered_object = []
 
@@ -28,122 +62,286 @@ class Renderer:
         self.screen = game.screen
 
         self.wall_textures = self._load_wall_textures()
+        self.wall_pixels = self._wall_texture_pixels(self.wall_textures)
         self.sky_texture = self._load_sky_texture()
 
         self.digits = self._load_digits()
         self.blood_screen = self._load_blood_screen()
+        self.win_screen = self._load_win_screen()
+        self.lose_screen = self._load_lose_screen()
+
+        # sky twice side by side above the floor, per size of the view
+        self.backgrounds = {}
+        # digits of the health, rebuilt when it changes
+        self.hud = None
+        self.hud_health = None
 
     def draw(self):
+        """Draw the 3D view into the viewport, upscale it and add the HUD."""
+        start = self.game.profiler.start()
         if not GRAPHICS.mode_2d:
-            self._draw_sky()
-            self._draw_floor()
+            self._draw_background()
+            if GRAPHICS.wall_renderer == 'pixel_buffer':
+                self._draw_walls()
+        self.game.profiler.stop('blitting', start)
+
         self._render_objects()
 
+        if self.game.profiler.overlay:
+            self.game.profiler.draw(self.screen)
+            self.game.mark_dirty(self.screen.get_rect())
+
     def render_win(self):
-        self.screen.blit(self._load_win_screen(), (0, 0))
+        self.game.mark_dirty(self.screen.blit(self.win_screen, (0, 0)))
 
     def render_loss(self):
-        self.screen.blit(self._load_lose_screen(), (0, 0))
+        self.game.mark_dirty(self.screen.blit(self.lose_screen, (0, 0)))
 
     def render_player_health(self):
-        for idx, char in enumerate(str(self.game.player.health)):
-            self.screen.blit(
-                self.digits[int(char)],
-                (idx * GRAPHICS.player_health_size, 0)
+        health = self.game.player.health
+        if health != self.hud_health:
+            self.hud = self._build_hud(health)
+            self.hud_health = health
+        self.game.mark_dirty(self.screen.blit(self.hud, (0, 0)))
+
+    def _build_hud(self, health) -> pg.Surface:
+        size = GRAPHICS.player_health_size
+        text = str(health)
+        hud = pg.Surface((len(text) * size, size), pg.SRCALPHA)
+        for idx, char in enumerate(text):
+            # digits don't overlap, so they are copied instead of blended
+            hud.blit(
+                self.digits[int(char)], (idx * size, 0),
+                special_flags=pg.BLEND_RGBA_MAX
             )
+        return hud
 
     def render_player_damage(self):
         if self.player_took_damage:
-            now = pg.time.get_ticks()
-            if not self.player_damage_time:
+            now = self.game.sim_clock.time
+            if self.player_damage_time is None:
                 self.player_damage_time = now
 
-            self.screen.blit(self.blood_screen, (0, 0))
+            self.game.mark_dirty(self.screen.blit(self.blood_screen, (0, 0)))
 
             if (now - self.player_damage_time) > \
                self.PLAYER_DAMAGE_ANIMATION_TIME:
                 self.player_took_damage = False
                 self.player_damage_time = None
 
-    def _draw_sky(self):
-        self.sky_offset = \
-            (self.sky_offset + self.player_rel_move_factor *
-             self.game.player.rel_move) % SCREEN.width
+    def _draw_background(self):
+        """Sky and floor with a single blit out of the baked background."""
+        viewport = self.game.viewport
+        size = viewport.width, viewport.height
+        background = self.backgrounds.get(size)
+        if background is None:
+            background = self.backgrounds[size] = \
+                self._bake_background(viewport)
 
-        self.screen.blit(
-            self.sky_texture, (-self.sky_offset, 0)
-        )
-        self.screen.blit(
-            self.sky_texture, (-self.sky_offset + SCREEN.width, 0)
+        # sky moves by one view width per field of view turned
+        self.sky_offset = (
+            self.game.player.view_heading / GRAPHICS.field_of_view *
+            viewport.width
+        ) % viewport.width
+
+        viewport.surface.blit(
+            background, (0, 0),
+            (int(self.sky_offset), 0, viewport.width, viewport.height)
         )
 
-    def _draw_floor(self):
-        pg.draw.rect(
-            self.screen, GRAPHICS.floor_color,
-            (0, SCREEN.half_height, SCREEN.width, SCREEN.half_height)
+    def _bake_background(self, viewport) -> pg.Surface:
+        width, height = viewport.width, viewport.height
+        sky_texture = self.sky_texture
+        if width != SCREEN.width:
+            sky_texture = pg.transform.scale(
+                sky_texture, (width, viewport.half_height)
+            )
+
+        background = pg.Surface((2 * width, height), 0, self.screen)
+        background.blit(sky_texture, (0, 0))
+        background.blit(sky_texture, (width, 0))
+        background.fill(
+            GRAPHICS.floor_color,
+            (0, viewport.half_height, 2 * width, height - viewport.half_height)
         )
+        return background
 
     def _render_objects(self):
+        start = self.game.profiler.start()
+        # with depth buffer walls are drawn first, since they never overlap,
+        # and only sprites are sorted and clipped against them
+        depth_buffered = not GRAPHICS.mode_2d and (
+            GRAPHICS.depth_buffer or GRAPHICS.wall_renderer == 'pixel_buffer'
+        )
+        walls = []
         all_objects = \
-            self.game.ray_caster.objects_to_render + \
             self.game.sprites_handler.objects_to_render + \
-            self.game.weapon.objects_to_render + \
             self.game.npc_handler.objects_to_render
+        if depth_buffered:
+            walls = self.game.ray_caster.objects_to_render
+        else:
+            all_objects += self.game.ray_caster.objects_to_render
 
         all_objects = sorted(
             all_objects, key=lambda obj: obj.depth, reverse=True
         )
+        self.game.profiler.stop('sorting', start)
 
-        for obj in all_objects:
-            self.screen.blit(obj.image, obj.position)
+        start = self.game.profiler.start()
+        view = self.game.viewport.surface
+        view.blits([(obj.image, obj.position) for obj in walls], False)
+        if depth_buffered:
+            for obj in all_objects:
+                self._blit_occluded(obj)
+        else:
+            for obj in all_objects:
+                self.game.mark_dirty(view.blit(obj.image, obj.position))
+        self.game.viewport.present()
 
+        # weapon and HUD are drawn at the resolution of the window
+        for obj in self.game.weapon.objects_to_render:
+            self.game.mark_dirty(self.screen.blit(obj.image, obj.position))
         self.render_player_health()
         self.render_player_damage()
+        self.game.profiler.stop('blitting', start)
+
+    def _draw_walls(self):
+        """Write all wall columns into the pixel buffer of the view.
+
+        Every ray covers `GRAPHICS.scaling` pixel columns of the view,
+        which are gathered from `wall_pixels` for all rays and rows at once,
+        per band of rays of `RayCasting.map_bands`.
+        """
+        ray_caster = self.game.ray_caster
+        number_rays = len(ray_caster.depths)
+        if not number_rays:
+            return
+
+        pixels = pg.surfarray.pixels2d(self.game.viewport.surface)
+        ray_caster.map_bands(
+            functools.partial(self._draw_wall_band, pixels.T), number_rays
+        )
+        del pixels  # unlock view
+
+    def _draw_wall_band(self, pixels, band):
+        ray_caster = self.game.ray_caster
+        viewport = self.game.viewport
+
+        size = GRAPHICS.texture_size
+        heights = ray_caster.projection_heights[band]
+        tops = viewport.half_height - heights / 2
+
+        first_row = max(0, int(tops.min()))
+        last_row = min(
+            viewport.height,
+            int(np.ceil(viewport.half_height + heights.max() / 2))
+        )
+
+        # texture row per screen row and ray, indexed by [row, ray]
+        rows = np.arange(first_row, last_row)[:, None]
+        texture_y = (rows - tops) * (size / heights)
+        on_wall = (texture_y >= 0) & (texture_y < size)
+        texture_y = np.clip(texture_y, 0, size - 1).astype(np.intp)
+
+        texture_x = (
+            ray_caster.texture_offsets[band] * (size - GRAPHICS.scaling)
+        ).astype(np.intp)
+        texture_ids = ray_caster.texture_ids[band].astype(np.intp)
+
+        wall = self.wall_pixels.take(
+            (texture_ids * size + texture_y) * self.wall_pixels.shape[2] +
+            texture_x
+        )
+
+        view = pixels[
+            first_row:last_row,
+            band.start * GRAPHICS.scaling:band.stop * GRAPHICS.scaling
+        ]
+        np.copyto(view.view(wall.dtype), wall, where=on_wall)
+
+    def _blit_occluded(self, obj):
+        """Blit object only for those rays, where it is in front of walls."""
+        depths = self.game.ray_caster.depths
+        x, y = obj.position
+        x = int(x)  # like `blit`, for the same columns of the image
+        width, height = obj.image.get_size()
+
+        first = max(0, int(x // GRAPHICS.scaling))
+        last = min(len(depths), int(-(-(x + width) // GRAPHICS.scaling)))
+        if first >= last:
+            return
+
+        visible = np.zeros(last - first + 2, dtype=np.int8)
+        visible[1:-1] = depths[first:last] > obj.depth
+
+        runs = np.flatnonzero(np.diff(visible)).reshape(-1, 2) + first
+        for start, stop in runs.tolist():
+            x_start = max(x, start * GRAPHICS.scaling)
+            x_stop = min(x + width, stop * GRAPHICS.scaling)
+            self.game.viewport.surface.blit(
+                obj.image, (x_start, y),
+                (x_start - x, 0, x_stop - x_start, height)
+            )
+
+    def _wall_texture_pixels(self, textures):
+        """Pixels of all wall columns one ray can cover, in screen format.
+
+        Indexed by [texture id, y, x], each element holds the
+        `GRAPHICS.scaling` pixels right of x as one block, which lets
+        `_draw_walls` copy whole ray columns at once.
+        """
+        size = GRAPHICS.texture_size
+        pixels = np.zeros((max(textures) + 1, size, size), dtype=np.uint32)
+        for texture_id, texture in textures.items():
+            pixels[texture_id] = pg.surfarray.array2d(
+                texture.convert(self.screen)
+            ).T
+
+        columns = np.ascontiguousarray(
+            np.lib.stride_tricks.sliding_window_view(
+                pixels, GRAPHICS.scaling, axis=2
+            )
+        )
+        return columns.view(
+            np.dtype((np.void, columns.itemsize * GRAPHICS.scaling))
+        )[..., 0]
 
-    @staticmethod
-    def _grab_texture(path, res=(GRAPHICS.texture_size, GRAPHICS.texture_size)):
-        texture = pg.image.load(path).convert_alpha()
-        return pg.transform.scale(texture, res)
+    def _grab_texture(self, path, res=(GRAPHICS.texture_size, GRAPHICS.texture_size)):
+        return self.game.assets.load_image(path, res)
 
-    @classmethod
-    def _load_wall_textures(cls):
+    def _load_wall_textures(self):
         return {
-            _: cls._grab_texture(f'resources/textures/{_}.png')
+            _: self._grab_texture(f'resources/textures/{_}.png')
             for _ in range(1, 6)
         }
 
-    @classmethod
-    def _load_sky_texture(cls):
-        return cls._grab_texture(
-            f'resources/textures/sky.png',
+    def _load_sky_texture(self):
+        return self._grab_texture(
+            'resources/textures/sky.png',
             (SCREEN.width, SCREEN.half_height)
         )
 
-    @classmethod
-    def _load_blood_screen(cls):
-        return cls._grab_texture(
-            f'resources/textures/blood_screen.png',
+    def _load_blood_screen(self):
+        return self._grab_texture(
+            'resources/textures/blood_screen.png',
             (SCREEN.width, SCREEN.height)
         )
 
-    @classmethod
-    def _load_lose_screen(cls):
-        return cls._grab_texture(
-            f'resources/textures/game_over.png',
+    def _load_lose_screen(self):
+        return self._grab_texture(
+            'resources/textures/game_over.png',
             (SCREEN.width, SCREEN.height)
         )
 
-    @classmethod
-    def _load_win_screen(cls):
-        return cls._grab_texture(
-            f'resources/textures/win.png',
+    def _load_win_screen(self):
+        return self._grab_texture(
+            'resources/textures/win.png',
             (SCREEN.width, SCREEN.height)
         )
 
-    @classmethod
-    def _load_digits(cls):
+    def _load_digits(self):
         return {
-            _: cls._grab_texture(
+            _: self._grab_texture(
                 f'resources/textures/digits/{_}.png',
                 (GRAPHICS.player_health_size, GRAPHICS.player_health_size)
             )
@@ -0,0 +1,256 @@
+"""Record the input of a session and replay it deterministically.
+
+A recording holds the seed of the session, the real time and the shots
+of every frame and the pressed keys and mouse movement of every tick.
+Replaying it runs the exact same simulation, e.g. headless for profiling:
+
+    python -m python_doom.replay --record session.rec
+    python -m python_doom.replay session.rec --output replay.json
+
+Must be started from the repository root, like the game.
+"""
+import argparse
+import json
+import os
+import struct
+import time
+
+import numpy as np
+import pygame as pg
+
+from python_doom.benchmark import summarize
+from python_doom.controls import KEYS, LiveControls, TickInput
+from python_doom.game import Game
+from python_doom.settings import GraphicsConfig as GRAPHICS
+from python_doom.settings import SimulationConfig as SIMULATION
+
+
+MAGIC = b'PDRC'
+VERSION = 1
+
+# magic, version, seed, tick rate
+HEADER = struct.Struct('<4sHQH')
+# real time in ms, flags, number of ticks
+FRAME = struct.Struct('<dBB')
+# bitmask of `KEYS`, relative mouse movement
+TICK = struct.Struct('<Bh')
+
+SHOT = 1
+
+
+class InputRecorder:
+    """Controls passing on the input of `source`, which is written to `path`."""
+
+    def __init__(self, path, source=None):
+        self.source = source or LiveControls()
+        self.seed = self.source.seed
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(
+            MAGIC, VERSION, self.seed, SIMULATION.tick_rate
+        ))
+
+        self.frames = 0
+        self._flags = 0
+        self._frame_dt = 0.0
+        self._ticks = []
+
+    @property
+    def finished(self):
+        return self.source.finished
+
+    def events(self) -> list:
+        events = self.source.events()
+        self._flags = SHOT if any(
+            event.type == pg.MOUSEBUTTONDOWN and event.button == 1
+            for event in events
+        ) else 0
+        return events
+
+    def frame_dt(self, frame_dt: float) -> float:
+        self._frame_dt = self.source.frame_dt(frame_dt)
+        return self._frame_dt
+
+    def read(self) -> TickInput:
+        tick_input = self.source.read()
+        keys = sum(
+            bool(tick_input.keys[key]) << bit for bit, key in enumerate(KEYS)
+        )
+        mouse_rel = int(np.clip(tick_input.mouse_rel, -2 ** 15, 2 ** 15 - 1))
+        self._ticks.append(TICK.pack(keys, mouse_rel))
+        return tick_input
+
+    def end_frame(self):
+        self.source.end_frame()
+        self.file.write(
+            FRAME.pack(self._frame_dt, self._flags, len(self._ticks))
+        )
+        self.file.write(b''.join(self._ticks))
+        self.frames += 1
+        self._ticks = []
+
+    def close(self):
+        self.source.close()
+        self.file.close()
+
+
+class InputReplay:
+    """Controls feeding the input of a recording back into the game.
+
+    Window events other than mouse buttons are still passed on, so the
+    replay can be quit. Raises `RuntimeError` if the simulation asks for
+    another number of ticks than recorded.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        magic, version, self.seed, tick_rate = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is no recording of version {VERSION}')
+        if tick_rate != SIMULATION.tick_rate:
+            raise ValueError(
+                f'{path} was recorded at a tick rate of {tick_rate}, '
+                f'not {SIMULATION.tick_rate}'
+            )
+
+        # (real time, flags, array of tick input) per frame
+        self.recorded = []
+        offset = HEADER.size
+        while offset < len(data):
+            frame_dt, flags, ticks = FRAME.unpack_from(data, offset)
+            offset += FRAME.size
+            self.recorded.append((frame_dt, flags, np.frombuffer(
+                data, dtype=np.dtype([('keys', '<u1'), ('mouse_rel', '<i2')]),
+                count=ticks, offset=offset
+            )))
+            offset += ticks * TICK.size
+
+        self.frames = 0
+        self._tick = 0
+
+    @property
+    def finished(self):
+        return self.frames >= len(self.recorded)
+
+    def events(self) -> list:
+        events = [
+            event for event in pg.event.get()
+            if event.type not in (pg.MOUSEBUTTONDOWN, pg.MOUSEBUTTONUP)
+        ]
+        if self.recorded[self.frames][1] & SHOT:
+            events.append(pg.event.Event(pg.MOUSEBUTTONDOWN, button=1))
+        return events
+
+    def frame_dt(self, frame_dt: float) -> float:
+        return self.recorded[self.frames][0]
+
+    def read(self) -> TickInput:
+        ticks = self.recorded[self.frames][2]
+        if self._tick >= len(ticks):
+            raise RuntimeError(f'replay diverged in frame {self.frames}')
+
+        keys, mouse_rel = ticks[self._tick].tolist()
+        self._tick += 1
+        return TickInput(
+            {key: bool(keys >> bit & 1) for bit, key in enumerate(KEYS)},
+            mouse_rel
+        )
+
+    def end_frame(self):
+        if self._tick != len(self.recorded[self.frames][2]):
+            raise RuntimeError(f'replay diverged in frame {self.frames}')
+        self.frames += 1
+        self._tick = 0
+
+    def close(self):
+        pass
+
+
+class ReplayGame(Game):
+    """Game running a replay as fast as possible, keeping its frame times."""
+
+    def __init__(self, controls):
+        super().__init__(controls)
+        self.frame_times = []  # s of work per frame
+
+    def _limit_frame_rate(self):
+        self.clock.tick()
+        return 0  # replaced by the recorded frame time
+
+    def draw(self):
+        super().draw()
+        self.frame_times.append(self.frame_work)
+
+
+def replay(path, dynamic_resolution=GRAPHICS.dynamic_resolution) -> dict:
+    """Replay recording at `path` headless and return its frame times."""
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+
+    controls = InputReplay(path)
+    game = ReplayGame(controls)
+    if not dynamic_resolution:
+        game.resolution = None
+
+    start = time.perf_counter()
+    game.run()
+    total = time.perf_counter() - start
+
+    return {
+        'recording': path,
+        'seed': controls.seed,
+        'frames': controls.frames,
+        'ticks': game.sim_clock.ticks,
+        'total_s': total,
+        'frame_time_ms': summarize(game.frame_times),
+        'player': {
+            'position': [game.player.x, game.player.y],
+            'heading': game.player.heading,
+            'health': game.player.health,
+        },
+        'npc_alive': game.npc_handler.alive_count,
+    }
+
+
+def _seed(text) -> int:
+    seed = int(text)
+    if not 0 <= seed < 2 ** 64:
+        raise argparse.ArgumentTypeError(f'seed {text} is not within [0, 2**64)')
+    return seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('recording')
+    parser.add_argument('--record', action='store_true',
+                        help='play the game and record it')
+    parser.add_argument('--seed', type=_seed,
+                        help='seed of the recorded session')
+    parser.add_argument('--output', default='-',
+                        help='path of the JSON result of the replay')
+    parser.add_argument('--fixed-resolution', action='store_true',
+                        help='keep the resolution scale of the settings')
+    args = parser.parse_args()
+
+    if args.record:
+        game = Game(InputRecorder(args.recording, LiveControls(args.seed)))
+        game.run()
+        return
+
+    result = replay(
+        args.recording,
+        GRAPHICS.dynamic_resolution and not args.fixed_resolution
+    )
+    print(f'{result["frames"]} frames, {result["ticks"]} ticks in '
+          f'{result["total_s"]:.1f} s, frame time ' + ', '.join(
+              f'{key} {value:.2f} ms'
+              for key, value in result['frame_time_ms'].items()
+          ))
+    if args.output != '-':
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 import math
+import os
 
 from dataclasses import dataclass
 
@@ -12,6 +13,14 @@ class Difficulty:
     difficulty = None
 
 
+@dataclass
+class PathFindingConfig:
+    # one search from the player shared by all npc instead of one per npc
+    flow_field: bool = True
+    # reuse paths until the player tile or the npc occupancy changes
+    path_cache: bool = True
+
+
 @dataclass
 class ScreenConfig:
     width: int = 1600
@@ -22,6 +31,16 @@ class ScreenConfig:
     lock_fps: bool = True
 
 
+@dataclass
+class SimulationConfig:
+    tick_rate: int = 60  # simulation steps per second
+    max_ticks_per_frame: int = 5  # slow frames drop simulated time beyond
+    interpolate: bool = True  # render poses between the last two ticks
+    # headless batch simulation, see `python_doom.simulation`
+    batch_workers: int = os.cpu_count() or 1
+    max_match_time: float = 300  # simulated s until a match times out
+
+
 @dataclass
 class PlayerConfig:
     position: tuple = 14, 2
@@ -37,8 +56,50 @@ class GraphicsConfig:
     # 2D
     debug_rays: bool = False
     debug_line_of_sight = True
+    # update only the parts of the window drawn into, the map is baked into
+    # the background
+    dirty_rects: bool = True
     # 3D
     debug_render_textures: bool = True
+    # cast all rays as one NumPy batch, `False` falls back to per-ray loop
+    batch_ray_casting: bool = True
+    # reuse scaled wall columns, projection height is quantized in pixel
+    column_cache: bool = True
+    column_cache_max_bytes: int = 32 * 2 ** 20
+    column_height_step: int = 2
+    # 'columns' blits a scaled surface per ray, 'pixel_buffer' writes all
+    # wall columns straight into the pixel buffer of the screen
+    wall_renderer: str = 'columns'
+    # reuse scaled sprite images, projection height is quantized in pixel
+    sprite_cache: bool = True
+    sprite_cache_max_bytes: int = 64 * 2 ** 20
+    sprite_height_step: int = 4
+    # skip sprites and npc on tiles the player's tile can't possibly see,
+    # the table is computed once per map and cached in `pvs_cache_dir`
+    pvs_culling: bool = True
+    pvs_cache_dir: str = 'resources/cache'
+    # decoded and scaled images are baked into one file in `asset_cache_dir`
+    asset_cache: bool = True
+    asset_cache_dir: str = 'resources/cache'
+    # threads reading and decoding all assets at startup, 0 loads on demand,
+    # which is faster on a single core
+    asset_loader_workers: int = min(4, (os.cpu_count() or 1) - 1)
+    # the 3D view is rendered at `resolution_scale` of the window and then
+    # upscaled, `dynamic_resolution` adjusts the scale at runtime to hold
+    # `frame_time_budget` ms of work per frame
+    resolution_scale: float = 1.0
+    dynamic_resolution: bool = True
+    frame_time_budget: float = 1e3 / 60
+    min_resolution_scale: float = 0.5
+    max_resolution_scale: float = 1.0
+    resolution_scale_step: float = 0.05
+    resolution_adjust_frames: int = 30
+    # threads casting rays and writing wall columns in bands of the view,
+    # 1 does all of it on the main thread
+    ray_casting_workers: int = 1
+    # draw walls first and clip sprites and npc per column against the depth
+    # of the walls, hidden ones are skipped before they are scaled
+    depth_buffer: bool = True
 
     field_of_view: float = math.pi / 3
     half_fov: float = field_of_view / 2
@@ -58,6 +119,31 @@ class GraphicsConfig:
     player_health_size = 90
 
 
+@dataclass
+class ProfilerConfig:
+    enabled: bool = False
+    capacity: int = 600  # frames kept in ring buffer
+    overlay: bool = False
+    overlay_frames: int = 200
+    overlay_ms_height: int = 6  # pixel per ms
+    toggle_key: str = 'f3'  # toggle overlay and recording
+    dump_key: str = 'f4'
+    dump_frames: int = 300
+    dump_format: str = 'csv'  # or 'json'
+
+
+@dataclass
+class CaptureConfig:
+    enabled: bool = False  # capture from the first frame on
+    toggle_key: str = 'f5'  # start and stop a capture
+    path: str = 'capture_%Y%m%d_%H%M%S.rgb'
+    # 'raw' writes an RGB stream, 'mmap' copies into a memory-mapped file
+    # of `max_frames` frames
+    writer: str = 'raw'
+    max_frames: int = 3600
+    ring_size: int = 8  # frames waiting for the writer, further are dropped
+
+
 @dataclass
 class ControlsConfig:
     mouse_sensitivity: float = 0.0003
@@ -0,0 +1,441 @@
+"""Headless batch simulation of seeded matches over a process pool.
+
+Only the logic of `Player`, `NpcHandler` and `Weapon` is run, without
+window, surfaces, ray-cast rendering and sound, while a scripted bot
+plays. The outcome of every match is written as one row of a columnar
+file, e.g. to tune the difficulty:
+
+    python -m python_doom.simulation --matches 1000 --output matches.npz
+    python -m python_doom.simulation --set Difficulty.num_nps=30 \\
+        --set Soldier.accuracy=0.5 --set Weapon.damage=80
+
+Must be started from the repository root, like the game.
+"""
+import argparse
+import ast
+import csv
+import math
+import os
+import random
+import struct
+import time
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pygame as pg
+
+from python_doom.clock import SimulationClock
+from python_doom.controls import KEYS, TickInput
+from python_doom.maps import Maps
+from python_doom.npc import CacoDemon, CyberDemon, NpcHandler, Soldier
+from python_doom.path_finding import PathFinding
+from python_doom.player import Player
+from python_doom.pvs import PotentiallyVisibleSet
+from python_doom.ray_casting import line_of_sight
+from python_doom.weapons import Weapon
+from python_doom.settings import ControlsConfig as CONTROLS
+from python_doom.settings import Difficulty as DIFFICULTY
+from python_doom.settings import GraphicsConfig as GRAPHICS
+from python_doom.settings import PlayerConfig as PLAYER
+from python_doom.settings import SimulationConfig as SIMULATION
+
+
+# classes whose attributes can be set per batch by name
+TUNABLE = {
+    cls.__name__: cls for cls in [
+        DIFFICULTY, PLAYER, Soldier, CacoDemon, CyberDemon, Weapon
+    ]
+}
+
+SHOT = pg.event.Event(pg.MOUSEBUTTONDOWN, button=1)
+
+
+class FrameSize:
+    """Size of a frame as read from its PNG header, in place of a surface."""
+
+    def __init__(self, width, height):
+        self.width, self.height = width, height
+
+    def get_width(self) -> int:
+        return self.width
+
+    def get_height(self) -> int:
+        return self.height
+
+
+class FrameSizes:
+    """`FrameRegistry` of sizes, the simulation only counts and measures frames."""
+
+    def __init__(self):
+        self._frames = {}
+
+    def acquire(self, directory, scale=None, smooth=False) -> tuple:
+        key = directory, scale
+        frames = self._frames.get(key)
+        if frames is None:
+            files = [f for f in os.listdir(directory)
+                     if os.path.isfile(os.path.join(directory, f))]
+            frames = self._frames[key] = tuple(
+                self._size(os.path.join(directory, file), scale)
+                for file in sorted(files)
+            )
+        return frames
+
+    @staticmethod
+    def _size(path, scale) -> FrameSize:
+        with open(path, 'rb') as f:
+            width, height = struct.unpack('>II', f.read(24)[16:])
+        if scale is not None:
+            width, height = int(width * scale), int(height * scale)
+        return FrameSize(width, height)
+
+
+class Silence:
+    def play(self, loops=0):
+        pass
+
+
+class SilentSounds:
+    theme = shotgun = pain = npc_pain = npc_death = npc_attack = Silence()
+
+
+class Untimed:
+    """Profiler of the subsystems, matches are only timed as a whole."""
+
+    def start(self) -> float:
+        return 0.0
+
+    def stop(self, stage: str, start: float):
+        pass
+
+
+class Sight:
+    """Line of sight queries of `RayCasting`, without casting the view."""
+
+    def __init__(self, map):
+        self.map = map
+
+    def line_of_sight(self, sources, targets):
+        return line_of_sight(self.map.grid, sources, targets)
+
+
+class Bot:
+    """Scripted player, implements the methods of `LiveControls`.
+
+    Aims at and shoots the closest npc in sight until it is dead or out
+    of sight, otherwise walks along the shortest path towards the closest
+    living npc.
+    """
+    finished = False
+
+    # max heading error in rad to shoot and to walk
+    AIM_TOLERANCE = 0.02
+    WALK_TOLERANCE = 0.5
+    # npc in sight not hit for `STALL_TIME` ms are approached up to
+    # `CLOSE_DISTANCE`, e.g. if the line of sight flickers
+    STALL_TIME = 2000
+    CLOSE_DISTANCE = 2
+
+    def __init__(self, seed, game=None):
+        self.seed = seed
+        self.game = game
+
+        self._target = None
+        # health of the target when it was last hit and time of the hit
+        self._target_health = None
+        self._hit_at = 0.0
+        self._path_key = None
+        self._path = []
+
+    def _mouse_rel(self, x, y) -> tuple:
+        """Mouse movement turning towards `(x, y)` and remaining error."""
+        player = self.game.player
+        delta = (math.atan2(y - player.y, x - player.x) - player.heading
+                 + math.pi) % math.tau - math.pi
+        rel = round(delta / (CONTROLS.mouse_sensitivity * self.game.dt))
+        return rel, delta
+
+    def _target_in_sight(self):
+        npc = self.game.npc_handler
+        in_sight = npc.alive & npc.player_within_sight
+        # NOTE: keep the target, otherwise the aim may swing between two
+        if self._target is not None and in_sight[self._target]:
+            return self._target
+
+        in_sight = np.flatnonzero(in_sight)
+        self._target = in_sight[np.argmin(npc.dist_player[in_sight])] \
+            if len(in_sight) else None
+        return self._target
+
+    def _stalled(self, target) -> bool:
+        now = self.game.sim_clock.time
+        health = self.game.npc_handler.health[target]
+        if health != self._target_health:
+            self._target_health = health
+            self._hit_at = now
+        return now - self._hit_at > self.STALL_TIME
+
+    def events(self) -> list:
+        target = self._target_in_sight()
+        if target is None:
+            return []
+
+        npc = self.game.npc_handler
+        _, delta = self._mouse_rel(npc.x[target], npc.y[target])
+        return [SHOT] if abs(delta) < self.AIM_TOLERANCE else []
+
+    def frame_dt(self, frame_dt: float) -> float:
+        return frame_dt
+
+    def read(self) -> TickInput:
+        keys = dict.fromkeys(KEYS, False)
+        npc = self.game.npc_handler
+
+        target = self._target_in_sight()
+        if target is not None:
+            rel, _ = self._mouse_rel(npc.x[target], npc.y[target])
+            keys[pg.K_w] = self._stalled(target) and \
+                npc.dist_player[target] > self.CLOSE_DISTANCE
+            return TickInput(keys, rel)
+
+        x, y = self._next_tile()
+        rel, delta = self._mouse_rel(x + 0.5, y + 0.5)
+        keys[pg.K_w] = abs(delta) < self.WALK_TOLERANCE
+        return TickInput(keys, rel)
+
+    def _next_tile(self) -> tuple:
+        npc = self.game.npc_handler
+        start = self.game.player.tile_position
+
+        alive = np.flatnonzero(npc.alive)
+        x, y = self.game.player.position
+        closest = alive[np.argmin(np.hypot(npc.x[alive] - x, npc.y[alive] - y))]
+        target = int(npc.tile_x[closest]), int(npc.tile_y[closest])
+
+        if (start, target) != self._path_key:
+            self._path_key = start, target
+            self._path = self._bfs(start, target)
+        return self._path[0] if self._path else target
+
+    def _bfs(self, start, target) -> list:
+        """Tiles from the one after `start` to `target`, empty if unreachable."""
+        graph = self.game.path_finding.graph
+        queue = deque([start])
+        visited = {start: None}
+        while queue:
+            node = queue.popleft()
+            if node == target:
+                break
+            for move in graph.get(node, []):
+                if move not in visited:
+                    visited[move] = node
+                    queue.append(move)
+
+        if target not in visited:
+            return []
+        path = []
+        while target != start:
+            path.append(target)
+            target = visited[target]
+        return path[::-1]
+
+    def end_frame(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class Match:
+    """Simulated subsystems of `Game` for one seeded match.
+
+    The bot plays unless other `controls` are given. Sprites only
+    animate, so they are left out.
+    """
+
+    SIMULATED_SUBSYSTEMS = ['player', 'npc_handler', 'weapon']
+
+    def __init__(self, seed, controls=None):
+        self.controls = controls or Bot(seed, self)
+        random.seed(seed)
+
+        self.sim_clock = SimulationClock()
+        self.dt = self.sim_clock.dt
+        self.profiler = Untimed()
+        self.frames = FrameSizes()
+        self.sounds = SilentSounds()
+        self.renderer = SimpleNamespace(player_took_damage=False)
+
+        self.map = Maps(self)
+        self.pvs = PotentiallyVisibleSet(self.map) \
+            if GRAPHICS.pvs_culling else None
+        self.path_finding = PathFinding(self)
+        self.ray_caster = Sight(self.map)
+        self.player = Player(self)
+        self.weapon = Weapon(self)
+        self.npc_handler = NpcHandler(self)
+        self.shots = 0
+
+    @property
+    def game_over(self) -> bool:
+        return self.player.health <= 0 or \
+            self.npc_handler.alive_count <= 0
+
+    def tick(self):
+        for event in self.controls.events():
+            shot_fired = self.player.shot_fired
+            self.player.check_shooting(event)
+            self.shots += self.player.shot_fired and not shot_fired
+        for name in self.SIMULATED_SUBSYSTEMS:
+            getattr(self, name).tick()
+        self.sim_clock.step()
+
+    def play(self, max_time=SIMULATION.max_match_time) -> dict:
+        """Run until game over or `max_time` s, return the outcome."""
+        npc = self.npc_handler
+        num_npc = len(npc.x)
+        # simulated ms the npc were first in sight and died
+        seen_at = np.full(num_npc, np.nan)
+        died_at = np.full(num_npc, np.nan)
+        initial_health = npc.health.sum()
+
+        start = time.perf_counter()
+        max_ticks = max_time * 1e3 / self.dt
+        while not self.game_over and self.sim_clock.ticks < max_ticks:
+            self.tick()
+            now = self.sim_clock.time
+            seen_at[np.isnan(seen_at) & npc.player_within_sight] = now
+            died_at[np.isnan(died_at) & ~npc.alive] = now
+
+        kills = ~npc.alive
+        time_to_kill = (died_at - seen_at)[kills] * 1e-3
+        won = not npc.alive.any()
+        return {
+            'seed': self.controls.seed,
+            'outcome': 'win' if won else
+                       'loss' if self.player.health <= 0 else 'timeout',
+            'duration_s': self.sim_clock.time * 1e-3,
+            'npc': num_npc,
+            'kills': int(kills.sum()),
+            'time_to_kill_s': float(time_to_kill.mean())
+            if len(time_to_kill) else math.nan,
+            'damage_taken': Player.health - self.player.health,
+            'damage_dealt': float(
+                initial_health - np.maximum(npc.health, 0).sum()
+            ),
+            'shots': self.shots,
+            'wall_time_s': time.perf_counter() - start,
+        }
+
+
+def configure(overrides):
+    """Set attributes of `TUNABLE` classes, `{'Class.attribute': value}`."""
+    for name, value in overrides.items():
+        cls, attribute = name.split('.')
+        if cls not in TUNABLE or not hasattr(TUNABLE[cls], attribute):
+            raise ValueError(f'{name} is no tunable attribute')
+        setattr(TUNABLE[cls], attribute, value)
+
+
+def play_match(seed) -> dict:
+    return Match(seed).play()
+
+
+def run(matches, workers=SIMULATION.batch_workers, seed=0,
+        overrides=None) -> dict:
+    """Play `matches` seeded matches, return the outcomes as columns."""
+    overrides = overrides or {}
+    seeds = range(seed, seed + matches)
+    if workers > 1:
+        with ProcessPoolExecutor(
+                workers, initializer=configure, initargs=(overrides,)
+        ) as pool:
+            rows = list(pool.map(
+                play_match, seeds, chunksize=max(1, matches // workers // 4)
+            ))
+    else:
+        configure(overrides)
+        rows = [play_match(s) for s in seeds]
+
+    return {
+        name: np.array([row[name] for row in rows]) for name in rows[0]
+    }
+
+
+def aggregate(columns) -> dict:
+    outcome = columns['outcome']
+    kills = columns['kills']
+    time_to_kill = np.nan_to_num(columns['time_to_kill_s'])
+    return {
+        'matches': len(outcome),
+        'win_rate': float(np.mean(outcome == 'win')),
+        'loss_rate': float(np.mean(outcome == 'loss')),
+        'timeout_rate': float(np.mean(outcome == 'timeout')),
+        'duration_s': float(columns['duration_s'].mean()),
+        'kills': float(kills.mean()),
+        # per killed npc, from first sight to death
+        'time_to_kill_s': float((time_to_kill * kills).sum() / kills.sum())
+        if kills.sum() else math.nan,
+        'damage_taken': float(columns['damage_taken'].mean()),
+        'damage_dealt': float(columns['damage_dealt'].mean()),
+        'shots': float(columns['shots'].mean()),
+    }
+
+
+def save(path, columns):
+    """Write one row per match as NumPy archive of columns or CSV, by suffix."""
+    if path.endswith('.csv'):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(zip(*(c.tolist() for c in columns.values())))
+        return
+
+    np.savez_compressed(path, **columns)
+
+
+def _parse_override(text) -> tuple:
+    name, _, value = text.partition('=')
+    try:
+        return name, ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        raise argparse.ArgumentTypeError(f'{text} is no Class.attribute=value')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--matches', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=SIMULATION.batch_workers)
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the first match, incremented per match')
+    parser.add_argument('--set', type=_parse_override, action='append',
+                        default=[], metavar='CLASS.ATTRIBUTE=VALUE',
+                        help='override, e.g. Difficulty.num_nps=30, of '
+                             + ', '.join(TUNABLE))
+    parser.add_argument('--output', default='matches.npz',
+                        help='path of the .npz or .csv per match, - for none')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    columns = run(args.matches, args.workers, args.seed, dict(args.set))
+    total = time.perf_counter() - start
+
+    stats = aggregate(columns)
+    print(f'{stats["matches"]} matches in {total:.1f} s on {args.workers} '
+          f'workers, {columns["duration_s"].sum() / total:.0f}x real time')
+    print(f'win rate {stats["win_rate"]:.1%}, loss rate {stats["loss_rate"]:.1%}, '
+          f'timeout rate {stats["timeout_rate"]:.1%}')
+    print(f'time to kill {stats["time_to_kill_s"]:.2f} s, '
+          f'damage taken {stats["damage_taken"]:.1f}, '
+          f'kills {stats["kills"]:.1f}, shots {stats["shots"]:.1f}, '
+          f'duration {stats["duration_s"]:.1f} s')
+
+    if args.output != '-':
+        save(args.output, columns)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,9 +8,12 @@ class Sounds:
         self.game = game
         pg.init()
 
-        self.theme = pg.mixer.Sound(self.PATH_FILES + 'theme.wav')
-        self.shotgun = pg.mixer.Sound(self.PATH_FILES + 'shotgun.wav')
-        self.pain = pg.mixer.Sound(self.PATH_FILES + 'player_pain.wav')
-        self.npc_pain = pg.mixer.Sound(self.PATH_FILES + 'npc_pain.wav')
-        self.npc_death = pg.mixer.Sound(self.PATH_FILES + 'npc_death.wav')
-        self.npc_attack = pg.mixer.Sound(self.PATH_FILES + 'npc_attack.wav')
+        self.theme = self._load('theme.wav')
+        self.shotgun = self._load('shotgun.wav')
+        self.pain = self._load('player_pain.wav')
+        self.npc_pain = self._load('npc_pain.wav')
+        self.npc_death = self._load('npc_death.wav')
+        self.npc_attack = self._load('npc_attack.wav')
+
+    def _load(self, file):
+        return self.game.assets.load_sound(self.PATH_FILES + file)
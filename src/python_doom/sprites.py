@@ -1,13 +1,13 @@
-import os
+import math
 
 import pygame as pg
 import numpy as np
 
-from collections import deque
 from pathlib import Path
 
-from python_doom.settings import ScreenConfig as SCREEN
 from python_doom.settings import GraphicsConfig as GRAPHICS
+from python_doom.cache import SurfaceCache
+from python_doom.clock import lerp
 from python_doom.maps import TILE_SIZE
 from python_doom.settings import PlayerConfig as PLAYER
 
@@ -48,6 +48,7 @@ class SpritesHandler:
 
     def __init__(self, game):
         self.game = game
+        self.sprites = []
 
         for static in STATICS:
             self.sprites.append(
@@ -58,30 +59,56 @@ class SpritesHandler:
                 AnimatedObject(self.game, **animation)
             )
 
+        self.x_tiles = np.array([int(s.x) for s in self.sprites], dtype=np.intp)
+        self.y_tiles = np.array([int(s.y) for s in self.sprites], dtype=np.intp)
+
+    def _potentially_visible(self, tile) -> list:
+        if self.game.pvs is None:
+            return self.sprites
+        visible = self.game.pvs.visible_mask(tile, self.x_tiles, self.y_tiles)
+        return [self.sprites[idx] for idx in np.flatnonzero(visible).tolist()]
+
+    def tick(self):
+        if GRAPHICS.mode_2d:
+            return
+
+        for sprite in self._potentially_visible(self.game.player.tile_position):
+            sprite.tick()
+
     def update(self):
         self.objects_to_render = []
 
-        for sprite in self.sprites:
-            if GRAPHICS.mode_2d:
+        if GRAPHICS.mode_2d:
+            for sprite in self.sprites:
                 self._draw_2d(sprite.x, sprite.y)
-                continue
+            return
+
+        for sprite in self._potentially_visible(
+                self.game.player.view_tile_position):
             obj = sprite.update()
             if obj:
                 self.objects_to_render.append(obj)
 
     def _draw_2d(self, x, y, r=100):
-        pg.draw.circle(
+        self.game.mark_dirty(pg.draw.circle(
             self.game.screen, (200, 200, 0),
             (int(x * r), int(y * r)),
             15
-        )
+        ))
 
 
 class SpriteObject:
+    # scaled images of all sprites, keyed by image and projection height
+    projection_cache = SurfaceCache(GRAPHICS.sprite_cache_max_bytes)
+
+    x_screen = -math.inf
+
     def __init__(self, game, path, pos, scale=1.0, height_shift=0.0):
         self.game = game
         self.player = game.player
         self.x, self.y = pos
+        # position before the last simulation tick
+        self.prev_x, self.prev_y = pos
         self.scale = scale
         self.height_shift = height_shift
 
@@ -89,21 +116,12 @@ class SpriteObject:
             self._load_image(path)
 
     def _load_image(self, path):
-        self.image = pg.image.load(path).convert_alpha()
+        self.image = self.game.assets.load_image(path)
         self.IMAGE_WIDTH = self.image.get_width()
         self.IMAGE_HALF_WIDTH = self.IMAGE_WIDTH // 2
         self.IMAGE_RATIO = self.IMAGE_WIDTH / self.image.get_height()
 
     def _project_spite(self):
-        height = GRAPHICS.screen_dist / self.norm_dist * self.scale
-        width = height * self.IMAGE_RATIO
-
-        image = pg.transform.scale(self.image, (int(width), int(height)))
-
-        half_width = width // 2
-        position = self.x_screen - half_width, \
-            SCREEN.half_height - height // 2 + height * self.height_shift
-
         if GRAPHICS.mode_2d:
             image = pg.transform.scale(self.image, (TILE_SIZE, TILE_SIZE))
             return RenderedObject(self.norm_dist, image, (
@@ -112,21 +130,56 @@ class SpriteObject:
                 )
             )
 
-        return RenderedObject(self.norm_dist, image, position)
+        return self.project(
+            self.game.viewport, self.image, self.IMAGE_RATIO, self.norm_dist,
+            self.x_screen, self.scale, self.height_shift
+        )
+
+    @classmethod
+    def project(cls, viewport, image, image_ratio, norm_dist, x_screen,
+                scale, height_shift) -> RenderedObject:
+        """Scale `image` to its height at `norm_dist` in front of the player."""
+        height = viewport.screen_dist / norm_dist * scale
+
+        if GRAPHICS.sprite_cache:
+            height = max(
+                GRAPHICS.sprite_height_step,
+                int(height) //
+                GRAPHICS.sprite_height_step * GRAPHICS.sprite_height_step
+            )
+            width = height * image_ratio
+            projected = cls.projection_cache.get(
+                (image, height),
+                lambda: pg.transform.scale(image, (int(width), int(height)))
+            )
+        else:
+            width = height * image_ratio
+            projected = pg.transform.scale(image, (int(width), int(height)))
+
+        half_width = width // 2
+        position = x_screen - half_width, \
+            viewport.half_height - height // 2 + height * height_shift
+
+        return RenderedObject(norm_dist, projected, position)
 
     def _calculate_sprite(self):
-        dx = self.x - self.player.x
-        dy = self.y - self.player.y
+        x, y = self.view_position
+        x_player, y_player = self.player.view_position
+        heading = self.player.view_heading
+
+        dx = x - x_player
+        dy = y - y_player
         theta = np.arctan2(dy, dx)
 
-        delta = theta - self.player.heading
+        delta = theta - heading
         # NOTE here 2pi still missing
-        if (dx > 0 and self.player.heading > np.pi) or (dx < 0 and dy < 0):
+        if (dx > 0 and heading > np.pi) or (dx < 0 and dy < 0):
             delta += (np.pi * 2)
 
-        delta_rays = delta / GRAPHICS.delta_angle
+        viewport = self.game.viewport
+        delta_rays = delta / viewport.delta_angle
         self.x_screen = \
-            (GRAPHICS.half_number_rays + delta_rays) * GRAPHICS.scaling
+            (viewport.half_number_rays + delta_rays) * viewport.scaling
 
         self.dist = np.hypot(dx, dy)
         self.norm_dist = self.dist * np.cos(delta)
@@ -135,9 +188,20 @@ class SpriteObject:
             return None
 
         # Sprite is visible for player
-        if -self.IMAGE_HALF_WIDTH < self.x_screen < (SCREEN.width + self.IMAGE_HALF_WIDTH):
+        if -self.IMAGE_HALF_WIDTH < self.x_screen < (viewport.width + self.IMAGE_HALF_WIDTH):
+            if GRAPHICS.depth_buffer and self._occluded(viewport):
+                return None
             return self._project_spite()
 
+    def _occluded(self, viewport) -> bool:
+        """Whether walls hide all columns of the sprite, before scaling it."""
+        half_width = viewport.screen_dist / self.norm_dist * self.scale * \
+            self.IMAGE_RATIO / 2
+        return not self.game.ray_caster.visible_spans(
+            self.x_screen - half_width, self.x_screen + half_width,
+            self.norm_dist
+        )[0]
+
     def _draw_2d_pos(self):
         self.game.screen
         pg.draw.circle(
@@ -146,15 +210,24 @@ class SpriteObject:
             15, 2
         )
 
+    def tick(self):
+        pass
+
     def update(self):
         # if GRAPHICS.mode_2d:
         #     self._draw_2d_pos()
         #     return None
         return self._calculate_sprite()
 
+    @property
+    def view_position(self):
+        """Position to render, interpolated between the last two ticks."""
+        alpha = self.game.sim_clock.alpha
+        return lerp(self.prev_x, self.x, alpha), lerp(self.prev_y, self.y, alpha)
+
 
 class AnimatedObject(SpriteObject):
-    images = []
+    images = ()
     animation_counter = 0
     animation_finished = True
 
@@ -162,32 +235,29 @@ class AnimatedObject(SpriteObject):
         super().__init__(game, path, pos, scale, height_shift)
         self.animation_time = animation_time
 
-        if not self.images:
-            self.images = self.grab_images(path)
+        # frames are shared, the instance only keeps its animation counter
+        self.images = self._acquire_images(path)
         self._check_images()
 
-        self.prev_time = pg.time.get_ticks()
+        self.prev_time = self.game.sim_clock.time
         self.animation_trigger = False
 
-    def update(self):
+    def tick(self):
         self._check_animation_time()
         self._animate()
-        return super().update()
 
     def _animate(self) -> bool:
         if self.animation_trigger:
-            if len(self.images) > 1:
-                self.images.rotate(-1)
-            self.image = self.images[0]
             self.animation_trigger = False
 
             self.animation_counter = \
                 (self.animation_counter + 1) % len(self.images)
+            self.image = self.images[self.animation_counter]
             self.animation_finished = self.animation_counter == 0
             return self.animation_finished
 
     def _check_animation_time(self):
-        now = pg.time.get_ticks()
+        now = self.game.sim_clock.time
         self.dt_ani = (now - self.prev_time)
         if (now - self.prev_time) > self.animation_time:
             self.prev_time = now
@@ -204,12 +274,5 @@ class AnimatedObject(SpriteObject):
 
         self.image = self.images[0]
 
-    @staticmethod
-    def grab_images(path: str) -> list:
-        images = deque()
-        files = [f for f in os.listdir(path)
-                 if os.path.isfile(os.path.join(path, f))]
-        for file in sorted(files):
-            image = pg.image.load(os.path.join(path, file)).convert_alpha()
-            images.append(image)
-        return images
+    def _acquire_images(self, path: str) -> tuple:
+        return self.game.frames.acquire(path)
@@ -0,0 +1,107 @@
+import math
+
+import numpy as np
+import pygame as pg
+
+from python_doom.settings import ScreenConfig as SCREEN
+from python_doom.settings import GraphicsConfig as GRAPHICS
+
+
+class Viewport:
+    """Resolution of the 3D view, which may change from frame to frame.
+
+    The view is rendered into `surface` and upscaled to the window by
+    `present`. Its number of rays follows `scale`, while every ray still
+    covers `GRAPHICS.scaling` pixel columns. At full scale the view is
+    rendered straight into the window.
+    """
+
+    def __init__(self, screen, scale=GRAPHICS.resolution_scale):
+        self.screen = screen
+        self.surface = screen
+        self.number_rays = None
+        self._surfaces = {}
+        self.set_scale(scale)
+
+    def set_scale(self, scale):
+        number_rays = max(2, round(GRAPHICS.number_rays * scale))
+        if number_rays == self.number_rays:
+            return
+
+        self.number_rays = number_rays
+        self.scale = number_rays / GRAPHICS.number_rays
+        self.half_number_rays = number_rays // 2
+        self.delta_angle = GRAPHICS.field_of_view / number_rays
+        self.scaling = GRAPHICS.scaling
+
+        self.width = number_rays * self.scaling
+        self.height = round(SCREEN.height * self.scale)
+        self.half_width = self.width // 2
+        self.half_height = self.height // 2
+        self.screen_dist = self.half_width / math.tan(GRAPHICS.half_fov)
+
+        # angles of all rays relative to the player heading
+        self.ray_angles = -GRAPHICS.half_fov + \
+            self.delta_angle * np.arange(number_rays)
+        # factor to remove fishbowl effects
+        self.fishbowl_correction = np.cos(self.ray_angles)
+
+        size = self.width, self.height
+        if size == self.screen.get_size():
+            self.surface = self.screen
+        else:
+            self.surface = self._surfaces.get(size)
+            if self.surface is None:
+                self.surface = self._surfaces[size] = \
+                    pg.Surface(size, 0, self.screen)
+
+    def present(self):
+        """Upscale the rendered view to the window."""
+        if self.surface is not self.screen:
+            pg.transform.scale(
+                self.surface, self.screen.get_size(), self.screen
+            )
+
+
+class ResolutionController:
+    """Adjusts the scale of a `Viewport` to hold a frame time budget.
+
+    Frame times are smoothed exponentially. Since rendering costs grow
+    with the number of pixels, the scale is changed by the square root of
+    budget over frame time, in steps of `GRAPHICS.resolution_scale_step`
+    and at most once every `GRAPHICS.resolution_adjust_frames` frames.
+    """
+    SMOOTHING = 0.1
+    # relative deviation from the budget, which is left alone
+    TOLERANCE = 0.1
+
+    def __init__(self, viewport, budget=GRAPHICS.frame_time_budget):
+        self.viewport = viewport
+        self.budget = budget
+        self.frame_time = budget
+        self.frames = 0
+
+    def update(self, frame_time: float):
+        """Account the time in ms spent on one frame."""
+        self.frame_time += self.SMOOTHING * (frame_time - self.frame_time)
+        self.frames += 1
+        if self.frames < GRAPHICS.resolution_adjust_frames:
+            return
+
+        ratio = self.budget / self.frame_time
+        if abs(ratio - 1) < self.TOLERANCE:
+            return
+
+        step = GRAPHICS.resolution_scale_step
+        current = self.viewport.scale
+        scale = round(current * math.sqrt(ratio) / step) * step
+        # move at least one step towards the budget
+        if ratio < 1:
+            scale = min(scale, current - step)
+        else:
+            scale = max(scale, current + step)
+        scale = min(max(scale, GRAPHICS.min_resolution_scale),
+                    GRAPHICS.max_resolution_scale)
+
+        self.viewport.set_scale(scale)
+        self.frames = 0
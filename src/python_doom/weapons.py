@@ -1,6 +1,3 @@
-import pygame as pg
-from collections import deque
-
 from python_doom.sprites import AnimatedObject
 from python_doom.rendering import RenderedObject
 from python_doom.settings import ScreenConfig as SCREEN
@@ -29,22 +26,24 @@ class Weapon(AnimatedObject):
         super().__init__(game, **SHOTGUN)
         self.num_images = len(self.images)
 
-        # Additional scaling/shifting to super class
-        self.images = self._scale_weapon(self.images, 0.5)
+        # Additional shifting to super class
         self.position = self._weapon_position(self.images[0])
-        self.image = self.images[0]
 
-    def update(self):
+    def _acquire_images(self, path: str) -> tuple:
+        # Additional scaling to super class
+        return self.game.frames.acquire(path, scale=0.5, smooth=True)
 
+    def tick(self):
         if self.player.shot_fired:
             self.game.player.shot_fired = False
             self.reloading = True
 
-        # Because of `depth` = 0, we don't call super().update()
-        # -> manual creation of rendered object
         self._check_animation_time()
         self._animate_shooting()
 
+    def update(self):
+        # Because of `depth` = 0, we don't call super().update()
+        # -> manual creation of rendered object
         if GRAPHICS.mode_2d:
             return
 
@@ -57,17 +56,6 @@ class Weapon(AnimatedObject):
             if self._animate():
                 self.reloading = False
 
-    @staticmethod
-    def _scale_weapon(images, scale):
-        return deque(
-            [pg.transform.smoothscale(
-                image, (
-                    int(image.get_width() * scale),
-                    int(image.get_height() * scale)
-                )
-             ) for image in images]
-        )
-
     @staticmethod
     def _weapon_position(image):
         return (
@@ -0,0 +1,15 @@
+import os
+
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+
+@pytest.fixture(autouse=True)
+def repository_root(monkeypatch):
+    """Resources are loaded relative to the repository root, like the game."""
+    monkeypatch.chdir(ROOT)
@@ -0,0 +1,31 @@
+import pytest
+
+from python_doom.clock import SimulationClock
+
+
+def test_advance_keeps_remainder():
+    clock = SimulationClock(tick_rate=100, max_ticks_per_frame=5)
+
+    assert clock.advance(25) == 2
+    assert clock.accumulator == pytest.approx(5)
+    assert clock.advance(5) == 1
+    assert clock.accumulator == pytest.approx(0)
+
+
+def test_advance_clamps_slow_frames():
+    clock = SimulationClock(tick_rate=100, max_ticks_per_frame=5)
+
+    # simulated time beyond the clamp is dropped, only the remainder stays
+    assert clock.advance(1234) == 5
+    assert clock.accumulator == pytest.approx(4)
+    assert clock.advance(10) == 1
+    assert clock.accumulator == pytest.approx(4)
+
+
+def test_alpha():
+    clock = SimulationClock(tick_rate=100, interpolate=True)
+    clock.advance(15)
+    assert clock.alpha == pytest.approx(0.5)
+
+    clock.interpolate = False
+    assert clock.alpha == 1.0
@@ -0,0 +1,35 @@
+import numpy as np
+
+from python_doom.environment import VectorEnv, random_actions
+
+
+def run(workers, steps=40) -> list:
+    env = VectorEnv(3, seed=5, workers=workers, number_rays=16)
+    rng = np.random.default_rng(0)
+    try:
+        history = [{
+            name: array.copy() for name, array in env.reset().items()
+        }]
+        for _ in range(steps):
+            observations, reward, terminated, truncated = \
+                env.step(random_actions(rng, 3))
+            history.append({
+                'reward': reward.copy(),
+                'terminated': terminated.copy(),
+                'truncated': truncated.copy(),
+                **{name: array.copy() for name, array in observations.items()}
+            })
+    finally:
+        env.close()
+    return history
+
+
+def test_results_independent_of_workers():
+    single, pooled = run(workers=1), run(workers=2)
+
+    assert len(single) == len(pooled)
+    for expected, actual in zip(single, pooled):
+        assert expected.keys() == actual.keys()
+        for name in expected:
+            np.testing.assert_array_equal(expected[name], actual[name])
+    assert single[0]['depth'].shape == (3, 16)
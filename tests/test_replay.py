@@ -0,0 +1,113 @@
+import pygame as pg
+import pytest
+
+from python_doom.controls import KEYS, TickInput
+from python_doom.replay import InputRecorder, InputReplay
+from python_doom.simulation import SHOT, Match
+
+
+class ScriptedControls:
+    """Controls walking, turning and shooting in a fixed pattern."""
+
+    def __init__(self, seed, frames):
+        self.seed = seed
+        self.frames = frames
+        self.frame = 0
+        self.tick = 0
+        self.ticks = []  # (keys, mouse_rel) per tick
+
+    @property
+    def finished(self):
+        return self.frame >= self.frames
+
+    def events(self) -> list:
+        return [SHOT] if self.frame % 7 == 0 else []
+
+    def frame_dt(self, frame_dt: float) -> float:
+        # uneven frames, some of them without or with several ticks
+        return [5.0, 16.7, 40.0, 33.3][self.frame % 4]
+
+    def read(self) -> TickInput:
+        keys = dict.fromkeys(KEYS, False)
+        keys[pg.K_w] = self.tick % 90 < 60
+        keys[pg.K_a] = self.tick % 50 < 10
+        mouse_rel = (self.tick * 37) % 61 - 30
+        self.tick += 1
+        self.ticks.append((keys, mouse_rel))
+        return TickInput(keys, mouse_rel)
+
+    def end_frame(self):
+        self.frame += 1
+
+    def close(self):
+        pass
+
+
+def play(controls) -> Match:
+    """Run a match frame by frame like `Game.run`, without rendering."""
+    match = Match(controls.seed, controls)
+    while not controls.finished:
+        for event in controls.events():
+            match.player.check_shooting(event)
+        for _ in range(match.sim_clock.advance(controls.frame_dt(match.dt))):
+            for name in Match.SIMULATED_SUBSYSTEMS:
+                getattr(match, name).tick()
+            match.sim_clock.step()
+        controls.end_frame()
+    controls.close()
+    return match
+
+
+def state(match) -> dict:
+    player, npc = match.player, match.npc_handler
+    return {
+        'pose': (player.x, player.y, player.heading),
+        'health': player.health,
+        'ticks': match.sim_clock.ticks,
+        'npc_x': npc.x.tolist(),
+        'npc_y': npc.y.tolist(),
+        'npc_health': npc.health.tolist(),
+        'npc_alive': npc.alive.tolist(),
+    }
+
+
+@pytest.fixture(scope='module', autouse=True)
+def pygame_events():
+    pg.init()
+    yield
+    pg.quit()
+
+
+@pytest.fixture
+def recording(tmp_path):
+    path = str(tmp_path / 'session.rec')
+    source = ScriptedControls(seed=2 ** 63 + 5, frames=240)
+    match = play(InputRecorder(path, source))
+    return path, source, match
+
+
+def test_recording_loads_back(recording):
+    path, source, _ = recording
+    replay = InputReplay(path)
+
+    assert replay.seed == source.seed
+    assert len(replay.recorded) == source.frames
+    ticks = [
+        (keys, mouse_rel)
+        for _, _, frame_ticks in replay.recorded
+        for keys, mouse_rel in frame_ticks.tolist()
+    ]
+    assert ticks == [
+        (sum(keys[key] << bit for bit, key in enumerate(KEYS)), mouse_rel)
+        for keys, mouse_rel in source.ticks
+    ]
+    assert [flags for _, flags, _ in replay.recorded] == \
+        [int(frame % 7 == 0) for frame in range(source.frames)]
+
+
+def test_replay_reproduces_match(recording):
+    path, _, recorded = recording
+    replayed = play(InputReplay(path))
+
+    assert state(replayed) == state(recorded)
+    assert recorded.sim_clock.ticks > 0
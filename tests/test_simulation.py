@@ -0,0 +1,19 @@
+import numpy as np
+
+from python_doom import simulation
+from python_doom.settings import Difficulty
+
+
+def test_results_independent_of_workers(monkeypatch):
+    # restored after the test, `run` sets the overrides in this process
+    monkeypatch.setattr(Difficulty, 'num_nps', Difficulty.num_nps)
+    overrides = {'Difficulty.num_nps': 4}
+
+    single = simulation.run(3, workers=1, seed=11, overrides=overrides)
+    pooled = simulation.run(3, workers=2, seed=11, overrides=overrides)
+
+    assert single.keys() == pooled.keys()
+    for name in single:
+        if name != 'wall_time_s':
+            np.testing.assert_array_equal(single[name], pooled[name])
+    assert (single['npc'] == 4).all()